@@ -5,6 +5,7 @@ import numpy as np
 
 from nengo.builder.signal import SignalDict
 from nengo.cache import NoDecoderCache
+from nengo.solvers import CholeskyCache
 
 
 class Model(object):
@@ -15,6 +16,16 @@ class Model(object):
         self.label = label
         self.decoder_cache = decoder_cache
 
+        # Factorizations shared by connections with the same linear system
+        self.cholesky_cache = CholeskyCache()
+
+        # Whether to simulate identical neuron types with one operator
+        self.fuse_neurons = True
+        # Whether to simulate identical linear filters with one operator
+        self.fuse_synapses = True
+        # Whether to apply low-rank transforms from neurons in factored form
+        self.factor_transforms = False
+
         # We want to keep track of the toplevel network
         self.toplevel = None
         # Builders can set a config object to affect sub-builders
@@ -1,4 +1,5 @@
 import collections
+import copy
 
 import numpy as np
 
@@ -14,6 +15,7 @@ from nengo.ensemble import Ensemble, Neurons
 from nengo.neurons import Direct
 from nengo.node import Node
 from nengo.utils.builder import full_transform
+from nengo.utils.functions import is_pure
 
 
 BuiltConnection = collections.namedtuple(
@@ -53,6 +55,52 @@ def build_linear_system(model, conn, rng):
     return eval_points, activities, targets
 
 
+def low_rank_factors(A, max_rank, rng=np.random, rtol=1e-10):
+    """Factor ``A`` as ``np.dot(L, R)`` if its rank is at most ``max_rank``.
+
+    The range of ``A`` is estimated by multiplying it with a random matrix,
+    so the cost is that of ``max_rank + 1`` matrix-vector products with
+    ``A``. The factors are only returned if they reproduce ``A`` to within
+    ``rtol`` relative to its norm; otherwise, returns ``None``.
+    """
+    if max_rank < 1:
+        return None
+
+    Y = np.dot(A, rng.normal(size=(A.shape[1], max_rank + 1)))
+    U, s, _ = np.linalg.svd(Y, full_matrices=False)
+    rank = np.sum(s > rtol * s[0])
+    if rank == 0 or rank > max_rank:
+        return None
+
+    L = U[:, :rank]
+    R = np.dot(L.T, A)
+    if npext.norm(A - np.dot(L, R)) > rtol * npext.norm(A):
+        return None
+    return L, R
+
+
+def factoring_saves(rank, shape):
+    """Whether a rank-``rank`` factored ``shape`` matrix is cheaper to apply.
+    """
+    return rank * sum(shape) < np.prod(shape)
+
+
+def build_decoding(model, conn, decoders):
+    """Adds a ``DotInc`` applying ``decoders`` to the connection input.
+
+    Returns the decoded signal.
+    """
+    model.sig[conn]['decoders'] = Signal(
+        decoders, name="%s.decoders" % conn)
+    signal = Signal(np.zeros(decoders.shape[0]), name=str(conn))
+    model.add_op(Reset(signal))
+    model.add_op(DotInc(model.sig[conn]['decoders'],
+                        model.sig[conn]['in'],
+                        signal,
+                        tag="%s decoding" % conn))
+    return signal
+
+
 @Builder.register(Connection)  # noqa: C901
 def build_connection(model, conn):
     # Create random number generator
@@ -80,6 +128,7 @@ def build_connection(model, conn):
     decoders = None
     eval_points = None
     solver_info = None
+    factors = None
     transform = full_transform(conn, slice_pre=False)
 
     # Figure out the signal going across this connection
@@ -95,43 +144,67 @@ def build_connection(model, conn):
             fn = ((lambda x: x[conn.pre_slice]) if conn.function is None else
                   (lambda x: conn.function(x[conn.pre_slice])))
             model.add_op(SimPyFunc(
-                output=signal, fn=fn, t_in=False, x=model.sig[conn]['in']))
+                output=signal, fn=fn, t_in=False, x=model.sig[conn]['in'],
+                pure=conn.function is None or is_pure(conn.function)))
     elif isinstance(conn.pre_obj, Ensemble):
         # Normal decoded connection
         eval_points, activities, targets = build_linear_system(
             model, conn, rng)
 
-        # Use cached solver, if configured
+        # Use cached solver, if configured. Connections sharing the same
+        # activities also share the factorization of their Gram matrix.
         solver = model.decoder_cache.wrap_solver(conn.solver)
         if conn.solver.weights:
             # account for transform
             targets = np.dot(targets, transform.T)
             transform = np.array(1., dtype=np.float64)
-
-            decoders, solver_info = solver(
-                activities, targets, rng=rng,
-                E=model.params[conn.post_obj].scaled_encoders.T)
+            encoders = model.params[conn.post_obj].scaled_encoders.T
+
+            if conn.solver.compositional:
+                # Solve in the decoded space and only then multiply by the
+                # encoders, rather than solving for all post neurons
+                decoder_solver = copy.copy(conn.solver)
+                decoder_solver.weights = False
+                solver = model.decoder_cache.wrap_solver(decoder_solver)
+                with model.cholesky_cache:
+                    decoders, solver_info = solver(
+                        activities, targets, rng=rng)
+
+                # Apply the weights by decoding and then encoding if enabled,
+                # unless learning rules need the full matrix. The full matrix
+                # is kept in the built params either way.
+                weights_shape = (decoders.shape[0], encoders.shape[1])
+                if (model.factor_transforms and not conn.learning_rule_type
+                        and factoring_saves(encoders.shape[0], weights_shape)):
+                    factors = (encoders.T, decoders.T)
+                decoders = np.dot(decoders, encoders)
+            else:
+                with model.cholesky_cache:
+                    decoders, solver_info = solver(
+                        activities, targets, rng=rng, E=encoders)
             model.sig[conn]['out'] = model.sig[conn.post_obj.neurons]['in']
-            signal_size = model.sig[conn]['out'].size
         else:
-            decoders, solver_info = solver(activities, targets, rng=rng)
-            signal_size = conn.size_mid
+            with model.cholesky_cache:
+                decoders, solver_info = solver(activities, targets, rng=rng)
 
         # Add operator for decoders
         decoders = decoders.T
-
-        model.sig[conn]['decoders'] = Signal(
-            decoders, name="%s.decoders" % conn)
-        signal = Signal(np.zeros(signal_size), name=str(conn))
-        model.add_op(Reset(signal))
-        model.add_op(DotInc(model.sig[conn]['decoders'],
-                            model.sig[conn]['in'],
-                            signal,
-                            tag="%s decoding" % conn))
+        signal = build_decoding(
+            model, conn, decoders if factors is None else factors[1])
     else:
         # Direct connection
         signal = model.sig[conn]['in']
 
+        # Apply low-rank transforms (e.g. encoders times decoders) in
+        # factored form if enabled, unless learning rules need the full matrix
+        if (model.factor_transforms and transform.ndim == 2 and
+                not conn.learning_rule_type):
+            max_rank = min(min(transform.shape) // 10, 100)
+            if factoring_saves(max_rank, transform.shape):
+                factors = low_rank_factors(transform, max_rank, rng=rng)
+        if factors is not None:
+            signal = build_decoding(model, conn, factors[1])
+
     # Add operator for filtering
     if conn.synapse is not None:
         signal = filtered_signal(model, conn, signal, conn.synapse)
@@ -162,10 +235,14 @@ def build_connection(model, conn):
             transform = transform * gain
         else:
             transform *= gain[:, np.newaxis]
-
-    model.sig[conn]['transform'] = Signal(transform,
-                                          name="%s.transform" % conn)
-    if transform.ndim < 2:
+        if factors is not None:
+            factors = (factors[0] * gain[:, np.newaxis], factors[1])
+
+    # The full transform is kept in the built params, even if it is factored
+    model.sig[conn]['transform'] = Signal(
+        transform if factors is None else factors[0],
+        name="%s.transform" % conn)
+    if model.sig[conn]['transform'].ndim < 2:
         model.add_op(ElementwiseInc(model.sig[conn]['transform'],
                                     signal,
                                     model.sig[conn]['out'],
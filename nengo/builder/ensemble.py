@@ -9,7 +9,7 @@ from nengo.builder.operator import Copy, DotInc, Reset
 from nengo.builder.signal import Signal
 from nengo.dists import Distribution
 from nengo.ensemble import Ensemble
-from nengo.neurons import Direct
+from nengo.neurons import Direct, Izhikevich, RateLookup
 from nengo.utils.builder import default_n_eval_points
 
 
@@ -44,7 +44,8 @@ def gen_eval_points(ens, eval_points, rng, scale_eval_points=True):
 
 def get_activities(model, ens, eval_points):
     x = np.dot(eval_points, model.params[ens].encoders.T / ens.radius)
-    return ens.neuron_type.rates(
+    neuron_type = model.params.get(ens.neurons, ens.neuron_type)
+    return neuron_type.rates(
         x, model.params[ens].gain, model.params[ens].bias)
 
 
@@ -74,6 +75,13 @@ def build_ensemble(model, ens):
     max_rates = sample(ens.max_rates, ens.n_neurons, rng=rng)
     intercepts = sample(ens.intercepts, ens.n_neurons, rng=rng)
 
+    # Sample any per-neuron parameters of the neuron type
+    neuron_type = ens.neuron_type.per_neuron(ens.n_neurons, rng=rng)
+
+    # Make or load the table of rates with this model's decoder cache
+    if isinstance(neuron_type, Izhikevich) and neuron_type.has_rate_table:
+        neuron_type.rate_table(model.decoder_cache)
+
     # Build the neurons
     if ens.gain is not None and ens.bias is not None:
         gain = sample(ens.gain, ens.n_neurons, rng=rng)
@@ -84,7 +92,10 @@ def build_ensemble(model, ens):
                                   "Solving for one given the other is not "
                                   "implemented yet." % ens)
     else:
-        gain, bias = ens.neuron_type.gain_bias(max_rates, intercepts)
+        gain, bias = neuron_type.gain_bias(max_rates, intercepts)
+
+    if isinstance(neuron_type, RateLookup):
+        neuron_type = neuron_type.tabulate(gain, bias)
 
     if isinstance(ens.neuron_type, Direct):
         model.sig[ens.neurons]['in'] = Signal(
@@ -99,7 +110,8 @@ def build_ensemble(model, ens):
         model.add_op(Copy(src=Signal(bias, name="%s.bias" % ens),
                           dst=model.sig[ens.neurons]['in']))
         # This adds the neuron's operator and sets other signals
-        model.build(ens.neuron_type, ens.neurons)
+        model.build(neuron_type, ens.neurons)
+    model.params[ens.neurons] = neuron_type
 
     # Scale the encoders
     if isinstance(ens.neuron_type, Direct):
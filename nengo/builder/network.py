@@ -4,6 +4,7 @@ import numpy as np
 
 import nengo.utils.numpy as npext
 from nengo.builder.builder import Builder
+from nengo.builder.optimizer import fuse_neurons, fuse_synapses
 from nengo.builder.signal import Signal
 from nengo.network import Network
 from nengo.utils.compat import is_iterable, itervalues
@@ -80,3 +81,14 @@ def build_network(model, network):
     # Unset config
     model.config = old_config
     model.params[network] = None
+
+    if model.toplevel is network:
+        # All connections are built, so factorizations are no longer needed
+        model.cholesky_cache.clear()
+
+        # Fuse neurons first, so that filtered neuron outputs are fused into
+        # views of one signal, which synapses can read without gathering
+        if model.fuse_neurons:
+            fuse_neurons(model)
+        if model.fuse_synapses:
+            fuse_synapses(model)
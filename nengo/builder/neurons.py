@@ -4,7 +4,7 @@ from nengo.builder.builder import Builder
 from nengo.builder.signal import Signal
 from nengo.builder.operator import Operator
 from nengo.neurons import (AdaptiveLIF, AdaptiveLIFRate, Izhikevich, LIF,
-                           LIFRate, RectifiedLinear, Sigmoid)
+                           LIFRate, RateLookup, RectifiedLinear, Sigmoid)
 
 
 class SimNeurons(Operator):
@@ -25,9 +25,15 @@ class SimNeurons(Operator):
         J = signals[self.J]
         output = signals[self.output]
         states = [signals[state] for state in self.states]
-
-        def step():
-            self.neurons.step_math(dt, J, output, *states)
+        scratch = self.neurons.make_scratch(J.shape)
+
+        if scratch is None:
+            def step():
+                self.neurons.step_math(dt, J, output, *states)
+        else:
+            def step():
+                self.neurons.step_math(
+                    dt, J, output, *states, scratch=scratch)
         return step
 
 
@@ -106,3 +112,18 @@ def build_izhikevich(model, izhikevich, neurons):
                             output=model.sig[neurons]['out'],
                             states=[model.sig[neurons]['voltage'],
                                     model.sig[neurons]['recovery']]))
+
+
+@Builder.register(RateLookup)
+def build_ratelookup(model, lookup, neurons):
+    if lookup.table is None:
+        lookup = lookup.tabulate()
+    states = []
+    if lookup.adaptive:
+        model.sig[neurons]['adaptation'] = Signal(
+            np.zeros(neurons.size_in), name="%s.adaptation" % neurons)
+        states.append(model.sig[neurons]['adaptation'])
+    model.add_op(SimNeurons(neurons=lookup,
+                            J=model.sig[neurons]['in'],
+                            output=model.sig[neurons]['out'],
+                            states=states))
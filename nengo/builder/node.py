@@ -6,6 +6,7 @@ from nengo.builder.operator import Reset, SimPyFunc
 from nengo.node import Node
 from nengo.processes import Process
 from nengo.utils.compat import is_array_like
+from nengo.utils.functions import is_lookahead, is_pure
 
 
 @Builder.register(Node)
@@ -27,7 +28,8 @@ def build_node(model, node):
         sig_out = (Signal(np.zeros(node.size_out), name="%s.out" % node)
                    if node.size_out > 0 else None)
         model.add_op(SimPyFunc(
-            output=sig_out, fn=node.output, t_in=True, x=sig_in))
+            output=sig_out, fn=node.output, t_in=True, x=sig_in,
+            pure=is_pure(node.output), lookahead=is_lookahead(node.output)))
     elif is_array_like(node.output):
         sig_out = Signal(node.output, name="%s.out" % node)
     else:
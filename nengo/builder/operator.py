@@ -312,13 +312,27 @@ class DotInc(Operator):
 
 
 class SimPyFunc(Operator):
-    """Set signal `output` by some Python function of x, possibly t."""
+    """Set signal `output` by some Python function of x, possibly t.
+
+    If ``pure`` is True, ``fn`` is trusted not to modify its input and to
+    always return a value (see `nengo.utils.functions.pure`). It is then
+    given a read-only view of ``x`` rather than a copy, and its return value
+    is not checked.
+
+    If ``lookahead`` is True and ``fn`` is a function of time only, it is
+    evaluated for many steps at once (see `nengo.utils.functions.lookahead`).
+    The step function then has a ``lookahead(start, n_steps)`` method, which
+    the simulator calls with the first step and the number of steps of each
+    run; each step then just copies out its precomputed output.
+    """
 
-    def __init__(self, output, fn, t_in, x):
+    def __init__(self, output, fn, t_in, x, pure=False, lookahead=False):
         self.output = output
         self.fn = fn
         self.t_in = t_in
         self.x = x
+        self.pure = pure
+        self.lookahead = lookahead
 
         self.sets = [] if output is None else [output]
         self.incs = []
@@ -331,16 +345,66 @@ class SimPyFunc(Operator):
     def make_step(self, signals, dt, rng):
         output = signals[self.output] if self.output is not None else None
         fn = self.fn
-        t_in = self.t_in
-        t_sig = signals['__time__']
-
-        def step():
-            args = () if self.x is None else (np.copy(signals[self.x]),)
-            y = fn(t_sig.item(), *args) if t_in else fn(*args)
-            if output is not None:
+        if (self.lookahead and self.t_in and self.x is None
+                and output is not None):
+            return self._make_lookahead_step(signals, dt, output)
+
+        call = self._make_call(signals)
+
+        if output is None:
+            return call
+        elif self.pure:
+            def step():
+                output[...] = call()
+        else:
+            def step():
+                y = call()
                 if y is None:
                     raise ValueError(
                         "Function '%s' returned invalid value" % fn.__name__)
                 output[...] = y
 
         return step
+
+    def _make_lookahead_step(self, signals, dt, output, max_elements=2**20):
+        fn = self.fn
+        t_sig = signals['__time__']
+        size = output.size
+        max_steps = max(max_elements // max(size, 1), 1)
+
+        # precomputed outputs, their first step, and the end of the run
+        block = [np.zeros((0, size)), 0, 0]
+
+        def compute(start, n_steps):
+            t = dt * np.arange(start, start + min(max(n_steps, 1), max_steps))
+            block[:2] = np.reshape(fn(t), (len(t), size)), start
+
+        def step():
+            i = int(round(t_sig.item() / dt))
+            if not 0 <= i - block[1] < len(block[0]):
+                compute(i, block[2] - i)
+            output[...] = block[0][i - block[1]]
+
+        def lookahead(start, n_steps):
+            block[2] = start + n_steps
+            compute(start, n_steps)
+
+        step.lookahead = lookahead
+        return step
+
+    def _make_call(self, signals):
+        """Make a function calling ``fn`` with the right arguments."""
+        fn = self.fn
+        t_sig = signals['__time__']
+
+        if self.x is None:
+            return (lambda: fn(t_sig.item())) if self.t_in else fn
+
+        x = signals[self.x]
+        if self.pure:
+            x_view = x.view()
+            x_view.setflags(write=False)
+            return ((lambda: fn(t_sig.item(), x_view)) if self.t_in else
+                    (lambda: fn(x_view)))
+        return ((lambda: fn(t_sig.item(), x.copy())) if self.t_in else
+                (lambda: fn(x.copy())))
@@ -0,0 +1,256 @@
+"""Passes over a built model that reduce the number of operators."""
+
+import logging
+
+import numpy as np
+
+from nengo.builder.neurons import SimNeurons
+from nengo.builder.signal import Signal, SignalView
+from nengo.builder.synapses import SimLinearFilters, SimSynapse
+from nengo.neurons import neuron_params
+from nengo.params import is_param
+from nengo.synapses import LinearFilter
+from nengo.utils.compat import iteritems, itervalues
+from nengo.utils.graphs import toposort
+from nengo.utils.simulator import operator_depencency_graph
+
+logger = logging.getLogger(__name__)
+
+
+def replace_signals(model, replacements):
+    """Replace signals in all operators and in ``model.sig``.
+
+    Only the signals an operator declares (see `Operator.all_signals`) are
+    replaced, in the attributes that hold them directly or in lists or
+    tuples. Signals that `hidden_signal_bases` finds must not be replaced,
+    since some operator would keep using the old signal.
+
+    Parameters
+    ----------
+    model : Model
+        The built model.
+    replacements : dict
+        Maps base signals to the views that replace them. Views of a
+        replaced base signal are moved to the new base.
+    """
+    # views replaced in several places are replaced by the same new view
+    replaced = dict(replacements)
+    for op in model.operators:
+        declared = set(op.all_signals)
+        for attr, value in iteritems(op.__dict__):
+            op.__dict__[attr] = _replace_in(value, replaced, declared)
+
+    for sigs in itervalues(model.sig):
+        for key, sig in iteritems(sigs):
+            sigs[key] = _replace_in(sig, replaced)
+
+
+def _replace_in(value, replaced, declared=None):
+    if isinstance(value, (list, tuple)):
+        return type(value)(_replace_in(v, replaced, declared) for v in value)
+    elif not isinstance(value, SignalView) or (
+            declared is not None and value not in declared):
+        return value
+    elif value not in replaced and value.base in replaced:
+        new = replaced[value.base]
+        replaced[value] = SignalView(
+            new.base, value.shape, value.elemstrides,
+            new.offset + value.offset, name=value.name)
+    return replaced.get(value, value)
+
+
+def hidden_signal_bases(operators):
+    """Bases of signals that operators hold where they cannot be replaced.
+
+    These are signals that an operator does not declare, or holds in
+    containers other than lists or tuples (e.g., in a dict). Signals that an
+    operator only refers to in closures cannot be found, so operators
+    should not do that if their signals may be replaced.
+    """
+    hidden = set()
+    for op in operators:
+        declared = set(op.all_signals)
+        for value in itervalues(op.__dict__):
+            if isinstance(value, (list, tuple)):
+                items, visible = value, True
+            elif isinstance(value, dict):
+                items, visible = list(itervalues(value)), False
+            elif isinstance(value, (set, frozenset)):
+                items, visible = value, False
+            else:
+                items, visible = [value], True
+            hidden.update(v.base for v in items if isinstance(v, SignalView)
+                          and not (visible and v in declared))
+    return hidden
+
+
+def _depths(operators):
+    """Length of the longest dependency path leading to each operator."""
+    dg = operator_depencency_graph(operators)
+    order = toposort(dg)
+    depth = dict((op, 0) for op in order)
+    for op in order:
+        for post in dg[op]:
+            depth[post] = max(depth[post], depth[op] + 1)
+    return depth
+
+
+def neuron_type_key(neuron_type):
+    """A key that is equal for neuron types that can be simulated together.
+
+    Neuron parameters (see `NeuronParam`) are not part of the key, since
+    they can differ between neurons of the merged neuron type.
+    """
+    cls = type(neuron_type)
+    skip = neuron_params(neuron_type)
+    params = sorted((name, getattr(neuron_type, name)) for name in dir(cls)
+                    if is_param(getattr(cls, name)) and name not in skip)
+    return cls, tuple(params)
+
+
+def merge_neuron_types(neuron_types, sizes):
+    """Combine neuron types with the same key into one per-neuron type.
+
+    Parameters that are equal for all neuron types stay shared; others are
+    concatenated into one value per neuron.
+    """
+    merged = neuron_types[0]
+    for name in neuron_params(merged):
+        values = [getattr(nt, name) for nt in neuron_types]
+        if all(np.ndim(v) == 0 and v == values[0] for v in values):
+            continue
+        if merged is neuron_types[0]:
+            merged = merged.copy()
+        setattr(merged, name, np.hstack([
+            v * np.ones(n) for v, n in zip(values, sizes)]))
+    return merged
+
+
+def fuse_neurons(model):
+    """Merge `SimNeurons` operators simulating identical neuron types.
+
+    The input currents, outputs and states of the merged operators are
+    concatenated into new signals, so that each group of neurons is simulated
+    with one call to ``step_math``. The original signals become views of the
+    new ones, so probes and connections are unaffected.
+    """
+    # Only operators at the same depth in the dependency graph are merged,
+    # since there can be no path between them that merging would make cyclic
+    try:
+        depth = _depths(model.operators)
+    except ValueError:
+        return  # let the simulator report the cycle
+
+    hidden = hidden_signal_bases(model.operators)
+    groups = {}
+    for op in model.operators:
+        if isinstance(op, SimNeurons) and all(
+                isinstance(sig, Signal) and sig.ndim == 1
+                and sig not in hidden
+                for sig in [op.J, op.output] + op.states):
+            key = (depth[op], neuron_type_key(op.neurons))
+            groups.setdefault(key, []).append(op)
+
+    replacements = {}
+    fused = {}
+    for ops in itervalues(groups):
+        if len(ops) > 1:
+            fused[ops[0]] = _merge_sim_neurons(ops, replacements)
+            fused.update((op, None) for op in ops[1:])
+
+    if len(fused) == 0:
+        return
+
+    model.operators = [fused.get(op, op) for op in model.operators
+                       if fused.get(op, op) is not None]
+    replace_signals(model, replacements)
+
+
+def _concatenate(sigs, name, replacements):
+    """Concatenate ``sigs`` into a new base, of which they become views."""
+    base = Signal(np.hstack([sig.value for sig in sigs]), name=name)
+    offset = 0
+    for sig in sigs:
+        replacements[sig] = SignalView(
+            base, sig.shape, (1,), offset, name=sig.name)
+        offset += sig.size
+    return base
+
+
+def _merge_sim_neurons(ops, replacements):
+    name = type(ops[0].neurons).__name__
+    J = _concatenate([op.J for op in ops], "%s.J" % name, replacements)
+    output = _concatenate(
+        [op.output for op in ops], "%s.output" % name, replacements)
+    states = [_concatenate([op.states[i] for op in ops],
+                           "%s.state%d" % (name, i), replacements)
+              for i in range(len(ops[0].states))]
+    neurons = merge_neuron_types(
+        [op.neurons for op in ops], [op.J.size for op in ops])
+    logger.debug("Fused %d SimNeurons operators for %s", len(ops), name)
+    return SimNeurons(neurons, J, output, states=states)
+
+
+def fuse_synapses(model):
+    """Merge `SimSynapse` operators filtering with identical linear filters.
+
+    Linear filters with the same discretized coefficients are simulated by
+    one `SimLinearFilters` operator, which gathers their inputs and updates
+    the state of all of them with a few vectorized operations. The outputs
+    are concatenated into one new signal, of which the original outputs
+    become views. Inputs that no other operator uses are concatenated the
+    same way, so that they are read without gathering them.
+    """
+    # As in `fuse_neurons`, only operators at the same depth are merged
+    try:
+        depth = _depths(model.operators)
+    except ValueError:
+        return
+
+    hidden = hidden_signal_bases(model.operators)
+    groups = {}
+    for op in model.operators:
+        if (isinstance(op, SimSynapse)
+                and isinstance(op.synapse, LinearFilter)
+                and op.input.ndim == 1 and op.output.ndim == 1
+                and isinstance(op.output, Signal)
+                and op.output not in hidden):
+            ss = op.synapse.state_space(model.dt)
+            key = (depth[op],) + tuple(
+                (m.shape, m.tostring()) for m in ss)
+            groups.setdefault(key, (ss, []))[1].append(op)
+    groups = [group for group in itervalues(groups) if len(group[1]) > 1]
+    if len(groups) == 0:
+        return
+
+    # Inputs can only be concatenated if no other operator uses them, since
+    # operators using a view depend on all operators writing to its base
+    users = {}
+    for op in model.operators:
+        for sig in op.reads + op.updates:
+            users.setdefault(sig.base, set()).add(op)
+    unshared = hidden.union(op.output for _, ops in groups for op in ops)
+
+    replacements = {}
+    fused = {}
+    for ss, ops in groups:
+        inputs = [op.input for op in ops]
+        if len(set(inputs)) == len(inputs) and all(
+                isinstance(sig, Signal) and not sig.readonly
+                and sig not in unshared and users[sig] <= set(ops)
+                for sig in inputs):
+            _concatenate(inputs, "%s.input" % ops[0].synapse, replacements)
+        fused[ops[0]] = _merge_sim_synapses(ops, ss, replacements)
+        fused.update((op, None) for op in ops[1:])
+
+    model.operators = [fused.get(op, op) for op in model.operators
+                       if fused.get(op, op) is not None]
+    replace_signals(model, replacements)
+
+
+def _merge_sim_synapses(ops, ss, replacements):
+    name = str(ops[0].synapse)
+    output = _concatenate(
+        [op.output for op in ops], "%s.output" % name, replacements)
+    logger.debug("Fused %d SimSynapse operators for %s", len(ops), name)
+    return SimLinearFilters([op.input for op in ops], output, *ss)
@@ -3,7 +3,7 @@ import numpy as np
 from nengo.builder.builder import Builder
 from nengo.builder.signal import Signal
 from nengo.builder.operator import Operator
-from nengo.synapses import Lowpass, Synapse
+from nengo.synapses import LinearFilter, Lowpass, Synapse
 from nengo.utils.compat import is_number
 
 
@@ -30,6 +30,87 @@ class SimSynapse(Operator):
         return step
 
 
+class SimLinearFilters(Operator):
+    """Simulate many signals filtered by the same linear filter.
+
+    The inputs are gathered into one vector, which is filtered in state-space
+    form (see `LinearFilter.state_space`) with a state matrix holding one
+    column per element. The output is one signal with the filtered inputs
+    concatenated in order.
+
+    Inputs that are views of the same base signal are gathered with one
+    ``np.take``, and consecutive views of one base are read directly, so
+    `fuse_synapses` makes the inputs views of one base where it can.
+    """
+    def __init__(self, inputs, output, A, B, C, D):
+        self.inputs = inputs
+        self.output = output
+        self.A, self.B, self.C, self.D = A, B, C, D
+
+        self.sets = []
+        self.incs = []
+        self.reads = list(inputs)
+        self.updates = [output]
+
+    def make_step(self, signals, dt, rng):
+        output = signals[self.output]
+        step_f = LinearFilter.state_space_step(
+            self.A, self.B, self.C, self.D, output)
+        arrays, indices, positions = self._input_indices(signals)
+
+        if len(arrays) == 1:
+            x, idx = arrays[0], indices[0]
+            if np.array_equal(idx, np.arange(idx[0], idx[0] + idx.size)):
+                u = x[idx[0]:idx[0] + idx.size]
+
+                def step():
+                    step_f(u)
+            else:
+                u = np.zeros(output.size)
+
+                def step():
+                    np.take(x, idx, out=u)
+                    step_f(u)
+            return step
+
+        # gather the inputs by base, then put them in order
+        starts = np.cumsum([0] + [index.size for index in indices])
+        gathered = np.zeros(output.size)
+        gathers = [(array, index, gathered[start:start + index.size])
+                   for array, index, start in zip(arrays, indices, starts)]
+        order = np.concatenate([starts[b] + offset + np.arange(size)
+                                for b, offset, size in positions])
+        u = np.zeros(output.size)
+
+        def step():
+            for array, index, out in gathers:
+                np.take(array, index, out=out)
+            np.take(gathered, order, out=u)
+            step_f(u)
+
+        return step
+
+    def _input_indices(self, signals):
+        """Locate the inputs in the flattened arrays of their bases.
+
+        Returns the arrays, the indices of the inputs in each of them, and
+        for each input, the index of its base and its offset and size in
+        the indices for that base.
+        """
+        bases, indices, positions = [], [], []
+        for sig in self.inputs:
+            if sig.base not in bases:
+                bases.append(sig.base)
+                indices.append([])
+            b = bases.index(sig.base)
+            positions.append((b, sum(idx.size for idx in indices[b]),
+                              sig.size))
+            indices[b].append(
+                sig.offset + sig.elemstrides[0] * np.arange(sig.size))
+        arrays = [signals[base].reshape(-1) for base in bases]
+        return arrays, [np.concatenate(idx) for idx in indices], positions
+
+
 def filtered_signal(model, owner, sig, synapse):
     # Note: we add a filter here even if synapse < dt,
     # in order to avoid cycles in the op graph. If the filter
@@ -1,7 +1,7 @@
 """Caching capabilities for a faster build process."""
 
+import copy
 import hashlib
-import inspect
 import logging
 import os
 import struct
@@ -10,11 +10,16 @@ import numpy as np
 
 from nengo.rc import rc
 from nengo.utils.cache import byte_align, bytes2human, human2bytes
-from nengo.utils.compat import is_string, pickle, PY2
+from nengo.utils.compat import getargspec, is_string, pickle, PY2
 from nengo.utils import nco
+from nengo.utils.neurons import RateTable
 
 logger = logging.getLogger(__name__)
 
+# errors from reading a missing, partially written or corrupt cache file
+_READ_ERRORS = (IOError, OSError, EOFError, KeyError, ValueError,
+                struct.error, pickle.UnpicklingError)
+
 
 def get_fragment_size(path):
     try:
@@ -92,6 +97,8 @@ class DecoderCache(object):
     _CACHE_EXT = '.nco'
     _LEGACY = 'legacy.txt'
     _LEGACY_VERSION = 0
+    _ACTIVITIES_KEY_LEN = 10
+    _WARM_START_CANDIDATES = 10
 
     def __init__(self, read_only=False, cache_dir=None):
         self.read_only = read_only
@@ -230,16 +237,13 @@ class DecoderCache(object):
         func
             Wrapped decoder solver.
         """
+        defaults = _get_defaults(solver)
+
         def cached_solver(activities, targets, rng=None, E=None):
-            try:
-                args, _, _, defaults = inspect.getargspec(solver)
-            except TypeError:
-                args, _, _, defaults = inspect.getargspec(solver.__call__)
-            args = args[-len(defaults):]
-            if rng is None and 'rng' in args:
-                rng = defaults[args.index('rng')]
-            if E is None and 'E' in args:
-                E = defaults[args.index('E')]
+            if rng is None:
+                rng = defaults.get('rng')
+            if E is None:
+                E = defaults.get('E')
 
             key = self._get_cache_key(solver, activities, targets, rng, E)
             path = self._key2path(key)
@@ -248,8 +252,10 @@ class DecoderCache(object):
                     solver_info, decoders = nco.read(f)
             except:
                 logger.info("Cache miss [{0}].".format(key))
+                X0 = self._get_warm_start(solver, activities, targets)
+                kwargs = {} if X0 is None else {'X0': X0}
                 decoders, solver_info = solver(
-                    activities, targets, rng=rng, E=E)
+                    activities, targets, rng=rng, E=E, **kwargs)
                 if not self.read_only:
                     with open(path, 'wb') as f:
                         nco.write(f, solver_info, decoders)
@@ -259,9 +265,106 @@ class DecoderCache(object):
             return decoders, solver_info
         return cached_solver
 
+    def get_rate_table(self, key, make_table):
+        """Returns a cached `RateTable`, making and storing it if needed.
+
+        Parameters
+        ----------
+        key : object
+            Identifies the table. It must determine the table completely
+            (e.g., the neuron type, its parameters and the table range).
+        make_table : func
+            Called without arguments to make the table on a cache miss.
+
+        Returns
+        -------
+        RateTable
+        """
+        h = hashlib.sha1()
+        h.update(b'rate_table')
+        h.update(str(Fingerprint(key)).encode('utf-8'))
+        path = self._key2path(h.hexdigest())
+        try:
+            with open(path, 'rb') as f:
+                info, rates = nco.read(f)
+        except _READ_ERRORS:
+            logger.info("Cache miss [rate table %s].", key)
+            table = make_table()
+            if not self.read_only:
+                with open(path, 'wb') as f:
+                    nco.write(f, {'J_min': table.J_min,
+                                  'J_max': table.J_max,
+                                  'error': table.error}, table.rates)
+            return table
+        return RateTable(info['J_min'], info['J_max'], rates,
+                         error=info['error'])
+
+    def _get_warm_start(self, solver, activities, targets):
+        """Returns the best cached solution for the given activities.
+
+        If ``solver`` has ``warm_start`` set, returns the one of the most
+        recently written solutions for the same activity matrix with the
+        smallest residual on ``targets``. Returns ``None`` if the solver is
+        not warm-started or no solution does better than starting from zero.
+
+        Only solutions with the shape of decoders for ``targets`` are used,
+        since the initial guess is for the decoders. Weight solvers can thus
+        start from decoders cached for the same activities, but cached
+        weights are never used.
+        """
+        if not getattr(solver, 'warm_start', False):
+            return None
+
+        prefix = self._get_activities_key(activities)
+        directory = os.path.join(self.cache_dir, prefix[:2])
+        try:
+            paths = [os.path.join(directory, f) for f in os.listdir(directory)
+                     if f.startswith(prefix[2:])]
+        except OSError:
+            return None
+
+        stats = [(safe_stat(path), path) for path in paths]
+        paths = [path for st, path in sorted(
+            ((st.st_mtime, path) for st, path in stats if st is not None),
+            reverse=True)]
+
+        shape = (activities.shape[1],) + targets.shape[1:]
+        best, best_error = None, np.linalg.norm(targets)
+        for path in paths[:self._WARM_START_CANDIDATES]:
+            try:
+                with open(path, 'rb') as f:
+                    _, X = nco.read(f)
+            except _READ_ERRORS:
+                continue
+            if X.shape != shape:
+                continue
+            error = np.linalg.norm(np.dot(activities, X) - targets)
+            if error < best_error:
+                best, best_error = X, error
+
+        if best is not None:
+            logger.info("Warm-starting solver with cached solution.")
+        return best
+
+    def _get_activities_key(self, activities):
+        h = hashlib.sha1()
+        h.update(np.ascontiguousarray(activities).data)
+        h.update(struct.pack('qq', *np.shape(activities)))
+        return h.hexdigest()[:self._ACTIVITIES_KEY_LEN]
+
     def _get_cache_key(self, solver, activities, targets, rng, E):
+        # Keys start with a hash of the activities only, so that solutions
+        # for the same activities can be found for warm-starting solvers.
         h = hashlib.sha1()
 
+        # settings such as the number of parallel jobs do not change the
+        # solution, so they are left out of the key
+        execution_attrs = getattr(solver, '_execution_attrs', ())
+        if len(execution_attrs) > 0:
+            solver = copy.copy(solver)
+            for attr in execution_attrs:
+                solver.__dict__.pop(attr, None)
+
         if PY2:
             h.update(str(Fingerprint(solver)))
         else:
@@ -281,7 +384,7 @@ class DecoderCache(object):
 
         if E is not None:
             h.update(np.ascontiguousarray(E).data)
-        return h.hexdigest()
+        return self._get_activities_key(activities) + h.hexdigest()
 
     def _key2path(self, key):
         prefix = key[:2]
@@ -292,12 +395,31 @@ class DecoderCache(object):
         return os.path.join(directory, suffix + self._CACHE_EXT)
 
 
+def _get_defaults(func):
+    """Returns the default values of the keyword arguments of ``func``.
+
+    Returns an empty dict if the arguments cannot be inspected (e.g., for
+    ``functools.partial`` objects on Python 2).
+    """
+    for f in (func, getattr(func, '__call__', None)):
+        try:
+            spec = getargspec(f)
+        except TypeError:
+            continue
+        defaults = spec.defaults or ()
+        return dict(zip(spec.args[len(spec.args) - len(defaults):], defaults))
+    return {}
+
+
 class NoDecoderCache(object):
     """Provides the same interface as :class:`DecoderCache` without caching."""
 
     def wrap_solver(self, solver):
         return solver
 
+    def get_rate_table(self, key, make_table):
+        return make_table()
+
     def get_size_in_bytes(self):
         return 0
 
@@ -2,6 +2,7 @@ from .actionselection import BasalGanglia, Thalamus
 from .circularconvolution import CircularConvolution
 from .ensemblearray import EnsembleArray
 from .integrator import Integrator
+from .nodearray import NodeArray
 from .oscillator import Oscillator
 from .product import Product
 from .workingmemory import InputGatedMemory
@@ -0,0 +1,91 @@
+import numpy as np
+
+import nengo
+from nengo.utils.functions import is_pure, pure
+
+
+class NodeArray(nengo.Network):
+    """An array of Nodes computed by one vectorized function.
+
+    This acts like ``n_nodes`` Nodes with the same function, but the function
+    is called once per time step with the inputs of all Nodes stacked, rather
+    than once for each Node. This is much faster when there are many Nodes.
+
+    The Nodes are accessed by slicing ``input`` and ``output``, which are
+    both the single Node computing the array. For example, the input and
+    output of the ``i``-th Node are ``input[i*size_in:(i+1)*size_in]`` and
+    ``output[i*size_out:(i+1)*size_out]``.
+
+    Parameters
+    ----------
+    n_nodes : int
+        The number of Nodes in the array.
+    output : callable
+        The vectorized function computing all Nodes. If ``size_in`` is
+        zero, it is called with the time ``t`` only; otherwise, it is called
+        with ``t`` and an array with the input of each Node on a row, of shape
+        ``(n_nodes, size_in)``. It must return the output of each Node on a
+        row, of shape ``(n_nodes, size_out)``, or an array broadcastable to
+        that shape. If it is declared with `nengo.utils.functions.pure`, so is
+        the resulting Node.
+    size_in : int, optional
+        The number of input dimensions of each Node. Default: 0.
+    size_out : int, optional
+        The number of output dimensions of each Node. If not given, it is
+        determined by calling ``output``.
+    label : str, optional
+        A name to assign this NodeArray.
+        Used for visualization and debugging.
+    seed : int, optional
+        Random number seed that will be used in the build step.
+    add_to_container : bool, optional
+        Whether this network will be added to the current context.
+    """
+
+    def __init__(self, n_nodes, output, size_in=0, size_out=None,
+                 label=None, seed=None, add_to_container=None):
+        super(NodeArray, self).__init__(label, seed, add_to_container)
+
+        self.n_nodes = n_nodes
+        self.size_in_per_node = size_in
+        if size_out is None:
+            size_out = self._get_size_out(output)
+        self.size_out_per_node = size_out
+
+        fn = self._vectorize(output)
+        with self:
+            self.node = nengo.Node(fn, size_in=n_nodes * size_in,
+                                   size_out=n_nodes * size_out, label="node")
+        self.input = self.node
+        self.output = self.node
+
+    def _get_size_out(self, output):
+        args = (np.zeros((self.n_nodes, self.size_in_per_node)),)
+        y = output(0., *args) if self.size_in_per_node > 0 else output(0.)
+        y = np.asarray(y)
+        if y.ndim != 2 or y.shape[0] != self.n_nodes:
+            raise ValueError(
+                "Output of NodeArray function must have shape (n_nodes, "
+                "size_out) (got shape %s); set 'size_out' explicitly to "
+                "broadcast it" % (y.shape,))
+        return y.shape[1]
+
+    def _vectorize(self, output):
+        """Wrap ``output`` as a Node function on flattened arrays."""
+        shape_in = (self.n_nodes, self.size_in_per_node)
+        y = np.zeros((self.n_nodes, self.size_out_per_node))
+        y_flat = y.reshape(-1)
+        check = not is_pure(output)
+
+        def set_output(value):
+            if check and value is None:
+                raise ValueError(
+                    "Function '%s' returned invalid value" % output.__name__)
+            y[...] = value
+            return y_flat
+
+        if self.size_in_per_node > 0:
+            fn = lambda t, x: set_output(output(t, x.reshape(shape_in)))
+        else:
+            fn = lambda t: set_output(output(t))
+        return pure(fn) if not check else fn
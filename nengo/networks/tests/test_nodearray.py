@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import nengo
+from nengo.builder.operator import SimPyFunc
+from nengo.utils.functions import pure
+
+
+def test_nodearray(Simulator, seed):
+    n = 20
+    with nengo.Network(seed=seed) as model:
+        u = nengo.Node(lambda t: np.sin(t * np.arange(1, 2 * n + 1)))
+        array = nengo.networks.NodeArray(
+            n, lambda t, x: x[:, :1] * x[:, 1:] + t, size_in=2)
+        nengo.Connection(u, array.input, synapse=None)
+        up = nengo.Probe(u)
+        array_p = nengo.Probe(array.output)
+        i = 3
+        node_p = nengo.Probe(array.output[i:i + 1])
+
+    sim = Simulator(model)
+    sim.run(0.05)
+
+    assert array.node.size_out == n
+    assert sum(isinstance(op, SimPyFunc) for op in sim.model.operators) == 2
+
+    x = sim.data[up].reshape(-1, n, 2)
+    expected = x[:, :, 0] * x[:, :, 1] + sim.trange()[:, None]
+    assert np.allclose(sim.data[array_p], expected)
+    assert np.allclose(sim.data[node_p][:, 0], sim.data[array_p][:, i])
+
+
+def test_nodearray_time(Simulator):
+    """Time-only functions, broadcasting outputs, and pure functions."""
+    with nengo.Network() as model:
+        a = nengo.networks.NodeArray(5, lambda t: t, size_out=2)
+        b = nengo.networks.NodeArray(
+            5, pure(lambda t, x: x.sum(axis=1, keepdims=True)), size_in=2)
+        nengo.Connection(a.output, b.input, synapse=None)
+        a_p = nengo.Probe(a.output)
+        b_p = nengo.Probe(b.output)
+
+    sim = Simulator(model)
+    sim.run(0.01)
+    t = sim.trange()
+    assert np.allclose(sim.data[a_p], t[:, None])
+    assert np.allclose(sim.data[b_p], 2 * t[:, None])
+
+
+def test_nodearray_size_out():
+    with pytest.raises(ValueError):
+        nengo.networks.NodeArray(5, lambda t: t)
+
+    with nengo.Network():
+        array = nengo.networks.NodeArray(5, lambda t: np.ones((5, 3)))
+    assert array.size_out_per_node == 3
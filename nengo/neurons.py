@@ -1,16 +1,63 @@
 from __future__ import division
 
+import copy
 import logging
 
 import numpy as np
 
-from nengo.params import Parameter, NumberParam
+from nengo.cache import NoDecoderCache
+from nengo.dists import Distribution
+from nengo.params import is_param, IntParam, Parameter, NumberParam
 from nengo.utils.compat import range
-from nengo.utils.neurons import settled_firingrate
+from nengo.utils.neurons import make_rate_table, settled_firingrate
 
 logger = logging.getLogger(__name__)
 
 
+class NeuronParam(NumberParam):
+    """A parameter of a neuron model, shared by all neurons or per neuron.
+
+    Per-neuron values are given as an array with one value for each neuron,
+    or as a `Distribution` that is sampled when the ensemble is built.
+    """
+
+    def __set__(self, instance, value):
+        if not isinstance(value, Distribution) and np.ndim(value) > 0:
+            value = np.array(value, dtype=np.float64)
+        super(NeuronParam, self).__set__(instance, value)
+
+    def validate(self, instance, value):
+        if isinstance(value, Distribution):
+            Parameter.validate(self, instance, value)
+        elif isinstance(value, np.ndarray):
+            if value.ndim != 1:
+                raise ValueError("Per-neuron values must be a 1-D array "
+                                 "(got %dD)" % value.ndim)
+            for v in [value.min(), value.max()] if value.size > 0 else []:
+                super(NeuronParam, self).validate(instance, v)
+        else:
+            super(NeuronParam, self).validate(instance, value)
+
+
+def neuron_params(neuron_type):
+    """Names of the `NeuronParam` parameters of a neuron type."""
+    cls = type(neuron_type)
+    return [name for name in sorted(dir(cls))
+            if isinstance(getattr(cls, name), NeuronParam)]
+
+
+def _differs(value, default):
+    """Whether a parameter value differs from its default, for reprs."""
+    return isinstance(value, (np.ndarray, Distribution)) or value != default
+
+
+def _masked(param, mask):
+    """The values of a (possibly per-neuron) parameter where mask is true."""
+    if np.ndim(param) == 0:
+        return param
+    return np.broadcast_arrays(param, mask)[0][mask]
+
+
 class NeuronType(object):
 
     probeable = []
@@ -22,6 +69,39 @@ class NeuronType(object):
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, ", ".join(self._argreprs))
 
+    def per_neuron(self, n_neurons, rng=np.random):
+        """Returns this neuron type with parameters for ``n_neurons`` neurons.
+
+        Parameters given as a `Distribution` are sampled, and parameters given
+        as arrays are checked to have one value per neuron. If all parameters
+        are shared by all neurons, returns this neuron type unchanged.
+        """
+        names = neuron_params(self)
+        if all(not isinstance(getattr(self, name), Distribution) and
+               np.ndim(getattr(self, name)) == 0 for name in names):
+            return self
+
+        neuron_type = self.copy()
+        for name in names:
+            value = getattr(self, name)
+            if isinstance(value, Distribution):
+                setattr(neuron_type, name, value.sample(n_neurons, rng=rng))
+            elif np.size(value) not in (1, n_neurons):
+                raise ValueError(
+                    "%s must have one value per neuron (%d), got %d"
+                    % (name, n_neurons, np.size(value)))
+        return neuron_type
+
+    def copy(self):
+        """Returns a copy of this neuron type with the same parameters."""
+        # Parameter values are not stored on the instance, so copy them too
+        neuron_type = copy.copy(self)
+        cls = type(self)
+        for name in dir(cls):
+            if is_param(getattr(cls, name)):
+                setattr(neuron_type, name, getattr(self, name))
+        return neuron_type
+
     def rates(self, x, gain, bias):
         """Compute firing rates (in Hz) for given vector input, ``x``.
 
@@ -62,32 +142,37 @@ class NeuronType(object):
         """
         J_max = 0
         J_steps = 101  # Odd number so that 0 is a sample
-        max_rate = max_rates.max()
+
+        # With per-neuron parameters, each neuron has its own response curve
+        n_curves = max([1] + [np.size(getattr(self, name))
+                              for name in neuron_params(self)])
 
         # Start with dummy gain and bias so x == J in rate calculation
-        gain = np.ones(J_steps)
-        bias = np.zeros(J_steps)
-        rate = np.zeros(J_steps)
+        gain = np.ones((J_steps, n_curves))
+        bias = np.zeros((J_steps, n_curves))
+        rate = np.zeros((J_steps, n_curves))
 
         # Find range of J that will achieve max rates
-        while rate[-1] < max_rate and J_max < 100:
+        while np.any(rate[-1] < max_rates) and J_max < 100:
             J_max += 10
             J = np.linspace(-J_max, J_max, J_steps)
-            rate = self.rates(J, gain, bias)
-        J_threshold = J[np.where(rate <= 1e-16)[0][-1]]
+            rate = self.rates(J[:, np.newaxis], gain, bias)
 
         gain = np.zeros_like(max_rates)
         bias = np.zeros_like(max_rates)
         for i in range(intercepts.size):
-            ix = np.where(rate > max_rates[i])[0]
+            curve = rate[:, i if n_curves > 1 else 0]
+            J_threshold = J[np.where(curve <= 1e-16)[0][-1]]
+            ix = np.where(curve > max_rates[i])[0]
             if len(ix) == 0:
                 ix = -1
             else:
                 ix = ix[0]
-            if rate[ix] == rate[ix - 1]:
+            if curve[ix] == curve[ix - 1]:
                 p = 1
             else:
-                p = (max_rates[i] - rate[ix - 1]) / (rate[ix] - rate[ix - 1])
+                p = ((max_rates[i] - curve[ix - 1]) /
+                     (curve[ix] - curve[ix - 1]))
             J_top = p * J[ix] + (1 - p) * J[ix - 1]
 
             gain[i] = (J_threshold - J_top) / (intercepts[i] - 1)
@@ -95,6 +180,15 @@ class NeuronType(object):
 
         return gain, bias
 
+    def make_scratch(self, shape):
+        """Make buffers that `step_math` can reuse from step to step.
+
+        ``shape`` is the shape of the input current. If not None, the returned
+        buffers are passed to ``step_math`` as the ``scratch`` keyword argument
+        on every step.
+        """
+        return None
+
     def step_math(self, dt, J, output):
         raise NotImplementedError("Neurons must provide step_math")
 
@@ -136,7 +230,7 @@ class RectifiedLinear(NeuronType):
 class Sigmoid(NeuronType):
     """Neuron whose response curve is a sigmoid."""
 
-    tau_ref = NumberParam(low=0)
+    tau_ref = NeuronParam(low=0)
     probeable = ['rates']
 
     def __init__(self, tau_ref=0.002):
@@ -144,7 +238,8 @@ class Sigmoid(NeuronType):
 
     @property
     def _argreprs(self):
-        return [] if self.tau_ref == 0.002 else ["tau_ref=%s" % self.tau_ref]
+        return (["tau_ref=%s" % self.tau_ref]
+                if _differs(self.tau_ref, 0.002) else [])
 
     def gain_bias(self, max_rates, intercepts):
         """Return gain and bias given maximum firing rate and x-intercept."""
@@ -162,8 +257,8 @@ class Sigmoid(NeuronType):
 class LIFRate(NeuronType):
     """Rate version of the leaky integrate-and-fire (LIF) neuron model."""
 
-    tau_rc = NumberParam(low=0, low_open=True)
-    tau_ref = NumberParam(low=0)
+    tau_rc = NeuronParam(low=0, low_open=True)
+    tau_ref = NeuronParam(low=0)
     probeable = ['rates']
 
     def __init__(self, tau_rc=0.02, tau_ref=0.002):
@@ -173,9 +268,9 @@ class LIFRate(NeuronType):
     @property
     def _argreprs(self):
         args = []
-        if self.tau_rc != 0.02:
+        if _differs(self.tau_rc, 0.02):
             args.append("tau_rc=%s" % self.tau_rc)
-        if self.tau_ref != 0.002:
+        if _differs(self.tau_ref, 0.002):
             args.append("tau_ref=%s" % self.tau_ref)
         return args
 
@@ -198,11 +293,12 @@ class LIFRate(NeuronType):
         intercepts : list of floats
             X-intercepts of neurons.
         """
-        inv_tau_ref = 1. / self.tau_ref if self.tau_ref > 0 else np.inf
+        with np.errstate(divide='ignore'):
+            inv_tau_ref = 1. / np.asarray(self.tau_ref, dtype=np.float64)
         if (max_rates > inv_tau_ref).any():
             raise ValueError(
                 "Max rates must be below the inverse refractory period (%0.3f)"
-                % (inv_tau_ref))
+                % np.min(inv_tau_ref))
 
         x = 1.0 / (1 - np.exp(
             (self.tau_ref - (1.0 / max_rates)) / self.tau_rc))
@@ -214,8 +310,10 @@ class LIFRate(NeuronType):
         """Compute rates in Hz for input current (incl. bias)"""
         j = J - 1
         output[:] = 0  # faster than output[j <= 0] = 0
-        output[j > 0] = 1. / (
-            self.tau_ref + self.tau_rc * np.log1p(1. / j[j > 0]))
+        firing = j > 0
+        output[firing] = 1. / (
+            _masked(self.tau_ref, firing) +
+            _masked(self.tau_rc, firing) * np.log1p(1. / j[firing]))
         # the above line is designed to throw an error if any j is nan
         # (nan > 0 -> error), and not pass x < -1 to log1p
 
@@ -223,44 +321,63 @@ class LIFRate(NeuronType):
 class LIF(LIFRate):
     """Spiking version of the leaky integrate-and-fire (LIF) neuron model."""
 
-    min_voltage = NumberParam(high=0)
+    min_voltage = NeuronParam(high=0)
     probeable = ['spikes', 'voltage', 'refractory_time']
 
     def __init__(self, tau_rc=0.02, tau_ref=0.002, min_voltage=0):
         super(LIF, self).__init__(tau_rc=tau_rc, tau_ref=tau_ref)
         self.min_voltage = min_voltage
 
-    def step_math(self, dt, J, spiked, voltage, refractory_time):
+    def make_scratch(self, shape):
+        return {'dV': np.zeros(shape),
+                'scale': np.zeros(shape),
+                'spiking': np.zeros(shape, dtype=bool)}
+
+    def step_math(self, dt, J, spiked, voltage, refractory_time,
+                  scratch=None):
+        if scratch is None:
+            scratch = self.make_scratch(J.shape)
+        dV = scratch['dV']
+        scale = scratch['scale']
+        spiking = scratch['spiking']
 
         # update voltage using accurate exponential integration scheme
-        dV = -np.expm1(-dt / self.tau_rc) * (J - voltage)
+        np.subtract(J, voltage, out=dV)
+        dV *= -np.expm1(-dt / self.tau_rc)
         voltage += dV
-        voltage[voltage < self.min_voltage] = self.min_voltage
+        np.maximum(voltage, self.min_voltage, out=voltage)
 
         # update refractory period assuming no spikes for now
         refractory_time -= dt
 
         # set voltages of neurons still in their refractory period to 0
         # and reduce voltage of neurons partway out of their ref. period
-        voltage *= (1 - refractory_time / dt).clip(0, 1)
+        np.divide(refractory_time, dt, out=scale)
+        np.subtract(1, scale, out=scale)
+        np.clip(scale, 0, 1, out=scale)
+        voltage *= scale
+
+        # determine which neurons spike (if v > 1 set spiked = 1/dt)
+        np.greater(voltage, 1, out=spiking)
+        np.divide(spiking, dt, out=spiked)
 
-        # determine which neurons spike (if v > 1 set spiked = 1/dt, else 0)
-        spiked[:] = (voltage > 1) / dt
+        if not spiking.any():
+            return
 
         # linearly approximate time since neuron crossed spike threshold
-        overshoot = (voltage[spiked > 0] - 1) / dV[spiked > 0]
+        overshoot = (voltage[spiking] - 1) / dV[spiking]
         spiketime = dt * (1 - overshoot)
 
         # set spiking neurons' voltages to zero, and ref. time to tau_ref
-        voltage[spiked > 0] = 0
-        refractory_time[spiked > 0] = self.tau_ref + spiketime
+        voltage[spiking] = 0
+        refractory_time[spiking] = _masked(self.tau_ref, spiking) + spiketime
 
 
 class AdaptiveLIFRate(LIFRate):
     """Adaptive rate version of the LIF neuron model."""
 
-    tau_n = NumberParam(low=0, low_open=True)
-    inc_n = NumberParam(low=0)
+    tau_n = NeuronParam(low=0, low_open=True)
+    inc_n = NeuronParam(low=0)
     probeable = ['rates', 'adaptation']
 
     def __init__(self, tau_n=1, inc_n=0.01, **lif_args):
@@ -271,16 +388,20 @@ class AdaptiveLIFRate(LIFRate):
     @property
     def _argreprs(self):
         args = super(AdaptiveLIFRate, self)._argreprs
-        if self.tau_n != 1:
+        if _differs(self.tau_n, 1):
             args.append("tau_n=%s" % self.tau_n)
-        if self.inc_n != 0.01:
+        if _differs(self.inc_n, 0.01):
             args.append("inc_n=%s" % self.inc_n)
         return args
 
     def step_math(self, dt, J, output, adaptation):
         """Compute rates for input current (incl. bias)"""
+        LIFRate.step_math(self, dt, J - adaptation, output)
+        self.adapt(dt, output, adaptation)
+
+    def adapt(self, dt, output, adaptation):
+        """Update the adaptation given the output of the neurons."""
         n = adaptation
-        LIFRate.step_math(self, dt, J - n, output)
         n += (dt / self.tau_n) * (self.inc_n * output - n)
 
 
@@ -289,11 +410,12 @@ class AdaptiveLIF(AdaptiveLIFRate, LIF):
 
     probeable = ['spikes', 'adaptation', 'voltage', 'refractory_time']
 
-    def step_math(self, dt, J, output, voltage, ref, adaptation):
+    def step_math(self, dt, J, output, voltage, ref, adaptation,
+                  scratch=None):
         """Compute rates for input current (incl. bias)"""
-        n = adaptation
-        LIF.step_math(self, dt, J - n, output, voltage, ref)
-        n += (dt / self.tau_n) * (self.inc_n * output - n)
+        LIF.step_math(self, dt, J - adaptation, output, voltage, ref,
+                      scratch=scratch)
+        self.adapt(dt, output, adaptation)
 
 
 class Izhikevich(NeuronType):
@@ -334,14 +456,32 @@ class Izhikevich(NeuronType):
     .. [1] E. M. Izhikevich, "Simple model of spiking neurons."
        IEEE Transactions on Neural Networks, vol. 14, no. 6, pp. 1569-1572.
        (http://www.izhikevich.org/publications/spikes.pdf)
+
+    Notes
+    -----
+    Firing rates are interpolated from a table of simulated rates (see
+    `Izhikevich.rate_table`), which is made once for each parameter set and
+    stored in the decoder cache of the model being built. Currents above the
+    table range and neurons with per-neuron parameters are simulated
+    directly.
     """
 
-    tau_recovery = NumberParam(low=0, low_open=True)
-    coupling = NumberParam(low=0)
-    reset_voltage = NumberParam()
-    reset_recovery = NumberParam()
+    tau_recovery = NeuronParam(low=0, low_open=True)
+    coupling = NeuronParam(low=0)
+    reset_voltage = NeuronParam()
+    reset_recovery = NeuronParam()
     probeable = ['spikes', 'voltage', 'recovery']
 
+    # Input currents are clipped at -30 in step_math, so the table starts
+    # there; 500 is well above the currents needed for 1000 Hz.
+    # Set rate_table_points to None to always simulate rates.
+    rate_table_range = (-30., 500.)
+    rate_table_points = 1061
+    # Simulated rates are found to within about 1 Hz, the resolution of
+    # counting spikes for one second. Set to None to simulate every neuron
+    # for the full second.
+    rate_tol = 1.
+
     def __init__(self, tau_recovery=0.02, coupling=0.2,
                  reset_voltage=-65, reset_recovery=8):
         self.tau_recovery = tau_recovery
@@ -354,7 +494,7 @@ class Izhikevich(NeuronType):
         args = []
 
         def add(attr, default):
-            if getattr(self, attr) != default:
+            if _differs(getattr(self, attr), default):
                 args.append("%s=%s" % (attr, getattr(self, attr)))
         add("tau_recovery", 0.02)
         add("coupling", 0.2)
@@ -362,12 +502,64 @@ class Izhikevich(NeuronType):
         add("reset_recovery", 8)
         return args
 
+    @property
+    def has_rate_table(self):
+        """Whether rates are interpolated from `rate_table`."""
+        return self.rate_table_points is not None and all(
+            np.ndim(getattr(self, name)) == 0 for name in neuron_params(self))
+
     def rates(self, x, gain, bias):
         J = gain * x + bias
+        if not self.has_rate_table:
+            return self.simulated_rates(J)
+
+        table = self.rate_table()
+        rates = table(J)
+        above = J > table.J_max
+        if np.any(above):
+            rates[above] = self.simulated_rates(J[above])
+        return rates
+
+    def simulated_rates(self, J):
+        """Firing rates for input currents ``J``, found by simulation."""
+        J = np.array(J, dtype=np.float64)
         voltage = np.zeros_like(J)
         recovery = np.zeros_like(J)
+        if self.rate_tol is None or any(np.ndim(getattr(self, name)) > 0
+                                        for name in neuron_params(self)):
+            kwargs = {}
+        else:
+            kwargs = dict(tol=self.rate_tol, chunk_size=100000)
         return settled_firingrate(self.step_math, J, [voltage, recovery],
-                                  settle_time=0.001, sim_time=1.0)
+                                  settle_time=0.001, sim_time=1.0, **kwargs)
+
+    def rate_table(self, decoder_cache=None):
+        """Returns the table of firing rates for this parameter set.
+
+        The table is kept with this neuron type, and is loaded from or stored
+        in ``decoder_cache`` if it is made for the current parameters (the
+        builder passes the decoder cache of the model). Its ``error``
+        attribute estimates the largest difference between the table and the
+        simulated rates.
+        """
+        key = (type(self).__name__, self.rate_table_range,
+               self.rate_table_points) + tuple(
+            (name, float(getattr(self, name)))
+            for name in neuron_params(self))
+        table = getattr(self, '_rate_table', (None, None))
+        if table[0] != key:
+            def make_table():
+                table = make_rate_table(
+                    self.simulated_rates, self.rate_table_range[0],
+                    self.rate_table_range[1], self.rate_table_points)
+                logger.info("Made rate table for %s (error %0.3g Hz)",
+                            self, table.error)
+                return table
+            if decoder_cache is None:
+                decoder_cache = NoDecoderCache()
+            table = (key, decoder_cache.get_rate_table(key, make_table))
+            self._rate_table = table
+        return table[1]
 
     def step_math(self, dt, J, spiked, voltage, recovery):
         # Numerical instability occurs for very low inputs.
@@ -385,11 +577,13 @@ class Izhikevich(NeuronType):
         # threshold can cause the system to blow up, which we want
         # to avoid at all costs.
         spiked[:] = (voltage >= 30) / dt
-        voltage[spiked > 0] = self.reset_voltage
+        spiking = spiked > 0
+        voltage[spiking] = _masked(self.reset_voltage, spiking)
 
         dU = (self.tau_recovery * (self.coupling * voltage - recovery)) * 1000
         recovery[:] += dU * dt
-        recovery[spiked > 0] = recovery[spiked > 0] + self.reset_recovery
+        recovery[spiking] = (
+            recovery[spiking] + _masked(self.reset_recovery, spiking))
 
 
 class NeuronTypeParam(Parameter):
@@ -397,3 +591,133 @@ class NeuronTypeParam(Parameter):
         if neurons is not None and not isinstance(neurons, NeuronType):
             raise ValueError("'%s' is not a neuron type" % neurons)
         super(NeuronTypeParam, self).validate(instance, neurons)
+
+
+class RateLookup(NeuronType):
+    """Rate neurons that look up their firing rates in a table.
+
+    The firing rates of ``neuron_type`` are computed once, at ``n_points``
+    evenly spaced input currents from ``J_min`` to ``J_max``, and linearly
+    interpolated during the simulation. Currents outside that range are
+    clipped to it. If the range is not given, it is set when the ensemble is
+    built to cover the currents for inputs within the radius (with a margin
+    of 10% above), leaving out low currents for which the rates are
+    constant.
+
+    Adaptive neuron types (e.g., `AdaptiveLIFRate`) keep their adaptation;
+    the rates for the adapted currents are looked up.
+
+    Parameters
+    ----------
+    neuron_type : NeuronType
+        The neuron type whose rates are looked up. It cannot have
+        per-neuron parameters.
+    n_points : int, optional
+        The number of currents in the table. Default: 1000
+    J_min, J_max : float, optional
+        The range of currents in the table.
+    """
+
+    neuron_type = NeuronTypeParam()
+    n_points = IntParam(low=2)
+    J_min = NumberParam(optional=True)
+    J_max = NumberParam(optional=True)
+
+    def __init__(self, neuron_type, n_points=1000, J_min=None, J_max=None):
+        self.neuron_type = neuron_type
+        self.n_points = n_points
+        self.J_min = J_min
+        self.J_max = J_max
+        self.table = None
+
+    @property
+    def _argreprs(self):
+        args = [repr(self.neuron_type)]
+        if self.n_points != 1000:
+            args.append("n_points=%d" % self.n_points)
+        if self.J_min is not None:
+            args.append("J_min=%s" % self.J_min)
+        if self.J_max is not None:
+            args.append("J_max=%s" % self.J_max)
+        return args
+
+    @property
+    def adaptive(self):
+        return isinstance(self.neuron_type, AdaptiveLIFRate)
+
+    @property
+    def probeable(self):
+        return ['rates', 'adaptation'] if self.adaptive else ['rates']
+
+    def per_neuron(self, n_neurons, rng=np.random):
+        if any(isinstance(getattr(self.neuron_type, name), Distribution) or
+               np.ndim(getattr(self.neuron_type, name)) > 0
+               for name in neuron_params(self.neuron_type)):
+            raise ValueError("Cannot look up rates of %s, which has "
+                             "per-neuron parameters" % self.neuron_type)
+        return self
+
+    def tabulate(self, gain=None, bias=None):
+        """Returns a copy of these neurons with the rate table made.
+
+        Parameters
+        ----------
+        gain, bias : ndarray, optional
+            The gains and biases of the neurons, used to find the range of
+            currents if ``J_min`` or ``J_max`` is not given.
+        """
+        neuron_type = self.neuron_type
+
+        def rates(J):
+            return neuron_type.rates(J, 1., 0.)
+
+        lookup = self.copy()
+        if self.J_min is None or self.J_max is None:
+            if gain is None or bias is None:
+                raise ValueError("Need gain and bias to find the range of "
+                                 "currents for %s" % self)
+            J_min = np.min(bias - np.abs(gain))
+            J_max = np.max(bias + np.abs(gain))
+            if self.J_min is None:
+                lookup.J_min = self._constant_below(rates, J_min, J_max)
+            if self.J_max is None:
+                lookup.J_max = J_max + 0.1 * (J_max - lookup.J_min)
+
+        lookup.table = make_rate_table(
+            rates, lookup.J_min, lookup.J_max, self.n_points)
+        logger.debug("Made rate table for %s (error %0.3g Hz)",
+                     lookup, lookup.table.error)
+        return lookup
+
+    def _constant_below(self, rates, J_min, J_max, rtol=1e-6):
+        """Raise J_min to where the rates start to change.
+
+        Neurons with large gains receive very low currents, for which the
+        rates are usually constant (e.g., zero), so leaving them out of the
+        table gives a much finer resolution where it matters.
+        """
+        for _ in range(3):
+            J = np.linspace(J_min, J_max, self.n_points)
+            r = rates(J)
+            changed = np.abs(r - r[0]) > rtol * np.ptp(r)
+            k = np.argmax(changed)
+            if k <= 1:
+                break
+            J_min = J[k - 1]
+        return J_min
+
+    def rates(self, x, gain, bias):
+        if self.table is None:
+            return self.neuron_type.rates(x, gain, bias)
+        return self.table(gain * x + bias)
+
+    def gain_bias(self, max_rates, intercepts):
+        return self.neuron_type.gain_bias(max_rates, intercepts)
+
+    def step_math(self, dt, J, output, *states):
+        if self.adaptive:
+            adaptation, = states
+            output[...] = self.table(J - adaptation)
+            self.neuron_type.adapt(dt, output, adaptation)
+        else:
+            output[...] = self.table(J)
@@ -5,8 +5,10 @@ import numpy as np
 import nengo.utils.numpy as npext
 from nengo.dists import DistributionParam, Gaussian
 from nengo.params import BoolParam, IntParam, NumberParam, Parameter
-from nengo.synapses import LinearFilter, LinearFilterParam, Lowpass
+from nengo.synapses import (
+    _filt_linear, LinearFilter, LinearFilterParam, Lowpass)
 from nengo.utils.compat import range
+from nengo.utils.functions import piecewise
 
 
 class Process(object):
@@ -31,15 +33,24 @@ class Process(object):
     def make_step(self, size_in, size_out, dt, rng):
         raise NotImplementedError("Process must implement `make_step` method.")
 
+    def run_block(self, n_steps, size_out, dt, rng):
+        """Compute ``n_steps`` steps of output at once.
+
+        Processes can override this with a vectorized implementation that
+        gives the same output as calling the function from `make_step` for
+        times ``0, dt, 2*dt, ...``, which is what is done by default.
+        """
+        step = self.make_step(0, size_out, dt, rng)
+        output = np.zeros((n_steps, size_out))
+        for i in range(n_steps):
+            output[i] = step(i * dt)
+        return output
+
     def run_steps(self, n_steps, d=None, dt=None, rng=np.random):
         # TODO: allow running with input
         d = self.default_size_out if d is None else d
         dt = self.default_dt if dt is None else dt
-        step = self.make_step(0, d, dt, rng)
-        output = np.zeros((n_steps, d))
-        for i in range(n_steps):
-            output[i] = step(i * dt)
-        return output
+        return self.run_block(n_steps, d, dt, rng)
 
     def run(self, t, d=None, dt=None, rng=np.random):
         # TODO: allow running with input
@@ -57,6 +68,44 @@ class Process(object):
         return self.ntrange(n_steps, dt=dt)
 
 
+def sample_blocks(dist, d, rng, block_size, scale=None):
+    """Make a function returning one ``d``-dimensional sample per call.
+
+    Samples are drawn from ``dist`` ``block_size`` at a time into a
+    preallocated buffer, and handed out one row at a time. Since samples are
+    drawn in order, the stream for a given ``rng`` does not depend on
+    ``block_size`` for distributions that draw their samples in order.
+
+    Parameters
+    ----------
+    dist : Distribution
+        The distribution to draw samples from.
+    d : int
+        The dimensionality of each sample.
+    rng : `numpy.random.RandomState`
+        Random number generator used for all samples.
+    block_size : int
+        The number of samples drawn at once.
+    scale : float, optional
+        If given, samples are multiplied by this factor.
+    """
+    block = np.zeros((block_size, d))
+    index = [block_size]
+
+    def sample():
+        i = index[0]
+        if i == block_size:
+            block[...] = np.reshape(
+                dist.sample(n=block_size, d=d, rng=rng), block.shape)
+            if scale is not None:
+                np.multiply(block, scale, out=block)
+            i = 0
+        index[0] = i + 1
+        return block[i]
+
+    return sample
+
+
 class WhiteNoise(Process):
     """Full-spectrum white noise process.
 
@@ -80,6 +129,9 @@ class WhiteNoise(Process):
     dist = DistributionParam()
     scale = BoolParam()
 
+    # number of steps of noise drawn at once
+    block_size = 1000
+
     def __init__(self, dist=None, scale=True):
         super(WhiteNoise, self).__init__()
         self.dist = Gaussian(mean=0, std=1) if dist is None else dist
@@ -96,13 +148,21 @@ class WhiteNoise(Process):
 
         # separate RNG for simulation for step order independence
         sim_rng = np.random.RandomState(rng.randint(npext.maxint))
+        sample = sample_blocks(dist, size_out, sim_rng, self.block_size,
+                               scale=alpha if scale else None)
 
         def step(t):
-            x = dist.sample(n=1, d=size_out, rng=sim_rng)[0]
-            return alpha * x if scale else x
+            return sample()
 
         return step
 
+    def run_block(self, n_steps, size_out, dt, rng):
+        sim_rng = np.random.RandomState(rng.randint(npext.maxint))
+        output = np.reshape(
+            self.dist.sample(n=n_steps, d=size_out, rng=sim_rng),
+            (n_steps, size_out))
+        return output / np.sqrt(dt) if self.scale else output
+
 
 class FilteredNoise(Process):
     """Filtered white noise process.
@@ -127,6 +187,9 @@ class FilteredNoise(Process):
     dist = DistributionParam()
     scale = BoolParam()
 
+    # number of steps of noise drawn at once
+    block_size = 1000
+
     def __init__(self, synapse=None, synapse_kwargs={}, dist=None, scale=True):
         super(FilteredNoise, self).__init__()
         self.synapse = Lowpass(tau=0.005) if synapse is None else synapse
@@ -137,24 +200,31 @@ class FilteredNoise(Process):
     def make_step(self, size_in, size_out, dt, rng):
         assert size_in == 0
 
-        dist = self.dist
-        scale = self.scale
         alpha = 1. / np.sqrt(dt)
         output = np.zeros(size_out)
         filter_step = self.synapse.make_step(dt, output, **self.synapse_kwargs)
 
         # separate RNG for simulation for step order independence
         sim_rng = np.random.RandomState(rng.randint(npext.maxint))
+        sample = sample_blocks(self.dist, size_out, sim_rng, self.block_size,
+                               scale=alpha if self.scale else None)
 
         def step(t):
-            x = dist.sample(n=1, d=size_out, rng=sim_rng)[0]
-            if scale:
-                x *= alpha
-            filter_step(x)
+            filter_step(sample())
             return output
 
         return step
 
+    def run_block(self, n_steps, size_out, dt, rng):
+        sim_rng = np.random.RandomState(rng.randint(npext.maxint))
+        output = np.array(np.reshape(
+            self.dist.sample(n=n_steps, d=size_out, rng=sim_rng),
+            (n_steps, size_out)), dtype=np.float64)
+        if self.scale:
+            output /= np.sqrt(dt)
+        _filt_linear([output], self.synapse, dt, **self.synapse_kwargs)
+        return output
+
 
 class BrownNoise(FilteredNoise):
     """Brown noise process (aka Brownian noise, red noise, Wiener process).
@@ -194,40 +264,178 @@ class WhiteSignal(Process):
         If not specified, no filtering will be done.
     rms : float, optional
         The root mean square power of the filtered signal. Default: 0.5.
+    on_demand : bool, optional
+        Whether to synthesize the signal block by block from its nonzero
+        frequency coefficients, rather than computing the whole period at
+        once. Memory then scales with the bandwidth instead of the period,
+        at the cost of more computation per step. By default, this is done
+        when the whole period would have more than ``max_samples`` values,
+        and the cut-off keeps at most ``max_coefficients`` coefficients per
+        sample, so that synthesizing the signal is not much slower.
     """
-    def __init__(self, period, high=None, rms=0.5):
+
+    # precomputed signals larger than this are synthesized on demand...
+    max_samples = 2**24
+    # ...if they have at most this many coefficients per sample
+    max_coefficients = 1. / 32
+
+    def __init__(self, period, high=None, rms=0.5, on_demand=None):
         super(WhiteSignal, self).__init__()
         self.period = period
         self.high = high
         self.rms = rms
+        self.on_demand = on_demand
 
-    def make_step(self, size_in, size_out, dt, rng):
-        assert size_in == 0
-        d = size_out
+    def coefficients(self, d, dt, rng):
+        """The nonzero Fourier coefficients of the signal.
 
+        Returns an array with ``d`` rows and one column per frequency up to
+        the cut-off, and the number of samples in one period. The whole
+        spectrum is still drawn from ``rng`` (in chunks of rows), so the
+        signal for a given ``rng`` does not depend on the cut-off.
+        """
         n_coefficients = int(np.ceil(self.period / dt / 2.))
-        shape = (d, n_coefficients + 1)
+        n_keep = n_coefficients + 1
+        if self.high is not None:
+            freqs = npext.rfftfreq(2 * n_coefficients, d=dt)
+            n_keep = int(np.sum(freqs <= self.high))
+
         sigma = self.rms * np.sqrt(0.5)
-        coefficients = 1j * rng.normal(0., sigma, size=shape)
-        coefficients += rng.normal(0., sigma, size=shape)
+        coefficients = 1j * _normal_columns(rng, sigma, d, n_coefficients + 1,
+                                            n_keep)
+        coefficients += _normal_columns(rng, sigma, d, n_coefficients + 1,
+                                        n_keep)
         coefficients[:, 0] = 0.
-        coefficients[:, -1].imag = 0.
+        if n_keep == n_coefficients + 1:
+            coefficients[:, -1].imag = 0.
         if self.high is not None:
-            set_to_zero = npext.rfftfreq(2 * n_coefficients, d=dt) > self.high
-            coefficients[:, set_to_zero] = 0.
             power_correction = np.sqrt(
-                1. - np.sum(set_to_zero, dtype=float) / n_coefficients)
+                float(n_keep - 1) / n_coefficients)
             if power_correction > 0.:
                 coefficients /= power_correction
         coefficients *= np.sqrt(2 * n_coefficients)
-        signal = np.fft.irfft(coefficients, axis=1)
+        return coefficients, 2 * n_coefficients
 
-        def step(t):
-            i = int(round(t / dt))
-            return signal[:, i % signal.shape[1]]
+    def _on_demand(self, coefficients, n_samples):
+        if self.on_demand is None:
+            d, n_coef = coefficients.shape
+            return (d * n_samples > self.max_samples
+                    and n_coef <= self.max_coefficients * n_samples)
+        return self.on_demand
+
+    def make_step(self, size_in, size_out, dt, rng):
+        assert size_in == 0
+
+        coefficients, n_samples = self.coefficients(size_out, dt, rng)
+        if self._on_demand(coefficients, n_samples):
+            synthesize = _synthesizer(coefficients, n_samples)
+            # current block of the signal, and the index of its first sample
+            block = [np.zeros((size_out, 0)), 0]
+
+            def step(t):
+                i = int(round(t / dt)) % n_samples
+                if not block[1] <= i < block[1] + block[0].shape[1]:
+                    block[:] = synthesize(i)
+                return block[0][:, i - block[1]]
+        else:
+            signal = np.fft.irfft(coefficients, n=n_samples, axis=1)
+
+            def step(t):
+                i = int(round(t / dt))
+                return signal[:, i % signal.shape[1]]
 
         return step
 
+    def run_block(self, n_steps, size_out, dt, rng):
+        coefficients, n_samples = self.coefficients(size_out, dt, rng)
+        if self._on_demand(coefficients, n_samples):
+            synthesize = _synthesizer(coefficients, n_samples)
+            output = np.zeros((n_steps, size_out))
+            i = 0
+            while i < n_steps:
+                j = i % n_samples
+                block, start = synthesize(j)
+                m = min(start + block.shape[1], n_samples, j + n_steps - i) - j
+                output[i:i + m] = block[:, j - start:j - start + m].T
+                i += m
+            return output
+
+        signal = np.fft.irfft(coefficients, n=n_samples, axis=1)
+        return signal.T[np.arange(n_steps) % n_samples]
+
+
+def _normal_columns(rng, sigma, n_rows, n_cols, n_keep, chunk_size=2**20):
+    """First ``n_keep`` columns of ``rng.normal(0, sigma, (n_rows, n_cols))``.
+
+    The rows are drawn in chunks, so the full array is never allocated.
+    """
+    result = np.zeros((n_rows, n_keep))
+    rows = max(chunk_size // n_cols, 1)
+    for i in range(0, n_rows, rows):
+        chunk = rng.normal(0., sigma, size=(min(rows, n_rows - i), n_cols))
+        result[i:i + rows] = chunk[:, :n_keep]
+    return result
+
+
+def _synthesizer(coefficients, n_samples, block_elements=2**20):
+    """Make a function computing blocks of the inverse real FFT.
+
+    The function takes the index of a sample, and returns a block of the
+    signal (one row per dimension) along with the index of its first sample.
+    Only the given coefficients are used, so the cost is proportional to the
+    number of coefficients per sample.
+    """
+    n_coef = coefficients.shape[1]
+    k = np.arange(n_coef)
+
+    # weights of the inverse real FFT, in which all but the zero and
+    # Nyquist frequencies appear twice
+    weights = np.where((k == 0) | (2 * k == n_samples), 1., 2.) / n_samples
+    coefficients = coefficients * weights
+
+    block_size = int(np.clip(block_elements // n_coef, 1, n_samples))
+    angle = (2 * np.pi / n_samples) * (
+        np.outer(k, np.arange(block_size)) % n_samples)
+    cos, sin = np.cos(angle), np.sin(angle)
+
+    def synthesize(i):
+        start = i - i % block_size
+        shift = np.exp((2j * np.pi / n_samples) * (k * start % n_samples))
+        shifted = coefficients * shift
+        block = np.dot(shifted.real, cos) - np.dot(shifted.imag, sin)
+        return block, start
+
+    return synthesize
+
+
+class Piecewise(Process):
+    """A piecewise function of time (see `nengo.utils.functions.piecewise`).
+
+    As a Process, the function can be evaluated for many steps at once with
+    `Process.run_steps`, and used as the output of a Node.
+
+    Parameters
+    ----------
+    data : dict
+        The values to change to. Keys are the beginning time for the value.
+        Values can be int, float, list, or functions that return those.
+    """
+    def __init__(self, data):
+        super(Piecewise, self).__init__()
+        self.data = data
+        self.function = piecewise(data)
+        self.default_size_out = np.asarray(self.function(0.)).size
+
+    def make_step(self, size_in, size_out, dt, rng):
+        assert size_in == 0
+        assert size_out == self.default_size_out
+        return self.function
+
+    def run_block(self, n_steps, size_out, dt, rng):
+        assert size_out == self.default_size_out
+        return self.function(dt * np.arange(n_steps)).reshape(
+            n_steps, size_out)
+
 
 class ProcessParam(Parameter):
     """Must be a Process."""
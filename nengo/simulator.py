@@ -18,6 +18,7 @@ from nengo.cache import get_default_decoder_cache
 from nengo.utils.compat import range
 from nengo.utils.graphs import toposort
 from nengo.utils.progress import ProgressTracker
+from nengo.utils.realtime import RealTime
 from nengo.utils.simulator import operator_depencency_graph
 
 logger = logging.getLogger(__name__)
@@ -125,6 +126,9 @@ class Simulator(object):
         # Provide a nicer interface to probe outputs
         self.data = ProbeDict(self._probe_outputs)
 
+        # Timings of the last run paced to wall-clock time
+        self.realtime = None
+
         seed = np.random.randint(npext.maxint) if seed is None else seed
         self.reset(seed=seed)
 
@@ -184,7 +188,7 @@ class Simulator(object):
 
         self._probe()
 
-    def run(self, time_in_seconds, progress_bar=True):
+    def run(self, time_in_seconds, progress_bar=True, realtime=False):
         """Simulate for the given length of time.
 
         Parameters
@@ -203,13 +207,24 @@ class Simulator(object):
             For more control over the progress bar, pass in a
             :class:`nengo.utils.progress.ProgressBar`,
             or :class:`nengo.utils.progress.ProgressUpdater` instance.
+        realtime : bool or ``RealTime``, optional
+            Whether to pace the steps to wall-clock time.
+
+            By default, ``realtime=False``, which runs steps as fast as
+            possible. With ``realtime=True``, steps are run at the rate
+            of one per ``dt``, and the timings of the steps are recorded in
+            a new :class:`nengo.utils.realtime.RealTime` instance, available
+            as ``sim.realtime`` after the run.
+
+            To change the speed, or to accumulate timings over several
+            runs, pass in a :class:`nengo.utils.realtime.RealTime` instance.
         """
         steps = int(np.round(float(time_in_seconds) / self.dt))
         logger.debug("Running %s for %f seconds, or %d steps",
                      self.model.label, time_in_seconds, steps)
-        self.run_steps(steps, progress_bar=progress_bar)
+        self.run_steps(steps, progress_bar=progress_bar, realtime=realtime)
 
-    def run_steps(self, steps, progress_bar=True):
+    def run_steps(self, steps, progress_bar=True, realtime=False):
         """Simulate for the given number of `dt` steps.
 
         Parameters
@@ -228,11 +243,32 @@ class Simulator(object):
             For more control over the progress bar, pass in a
             :class:`nengo.utils.progress.ProgressBar`,
             or :class:`nengo.utils.progress.ProgressUpdater` instance.
+        realtime : bool or ``RealTime``, optional
+            Whether to pace the steps to wall-clock time.
+
+            By default, ``realtime=False``, which runs steps as fast as
+            possible. With ``realtime=True``, steps are run at the rate
+            of one per ``dt``, and the timings of the steps are recorded in
+            a new :class:`nengo.utils.realtime.RealTime` instance, available
+            as ``sim.realtime`` after the run.
+
+            To change the speed, or to accumulate timings over several
+            runs, pass in a :class:`nengo.utils.realtime.RealTime` instance.
         """
+        # let operators that can compute ahead of time do so for all steps
+        for lookahead in self._lookahead:
+            lookahead(self.n_steps + 1, steps)
+
         with ProgressTracker(steps, progress_bar) as progress:
-            for i in range(steps):
-                self.step()
-                progress.step()
+            if realtime:
+                if not isinstance(realtime, RealTime):
+                    realtime = RealTime()
+                self.realtime = realtime
+                realtime.run(self.step, steps, self.dt, progress.step)
+            else:
+                for i in range(steps):
+                    self.step()
+                    progress.step()
 
     def reset(self, seed=None):
         """Reset the simulator state.
@@ -260,6 +296,8 @@ class Simulator(object):
         self.rng = np.random.RandomState(self.seed)
         self._steps = [op.make_step(self.signals, self.dt, self.rng)
                        for op in self._step_order]
+        self._lookahead = [step.lookahead for step in self._steps
+                           if hasattr(step, 'lookahead')]
 
         # clear probe data
         for probe in self.model.probes:
@@ -7,33 +7,32 @@ Solvers that are only intended to solve for either decoders or weights can
 remove the `E` parameter or make it manditory as they see fit.
 """
 import collections
+import functools
+import hashlib
 import logging
+import os
+import struct
+import threading
 
 import numpy as np
 
 from nengo.params import Parameter
 import nengo.utils.numpy as npext
-from nengo.utils.compat import range, with_metaclass, iteritems
+from nengo.utils.compat import (
+    getargspec, iteritems, OrderedDict, range, with_metaclass)
 from nengo.utils.magic import DocstringInheritor
 
 logger = logging.getLogger(__name__)
 
 
-def cholesky(A, y, sigma, transpose=None):
-    """Solve the least-squares system using the Cholesky decomposition."""
-    m, n = A.shape
-    if transpose is None:
-        # transpose if matrix is fat, but not if we have sigmas for each neuron
-        transpose = m < n and sigma.size == 1
+def _gram_factor(A, sigma, transpose):
+    """Factor the regularized Gram matrix of ``A``.
 
-    if transpose:
-        # substitution: x = A'*xbar, G*xbar = b where G = A*A' + lambda*I
-        G = np.dot(A, A.T)
-        b = y
-    else:
-        # multiplication by A': G*x = A'*b where G = A'*A + lambda*I
-        G = np.dot(A.T, A)
-        b = np.dot(A.T, y)
+    Returns a function that solves ``G x = b`` for a given ``b``,
+    and the number of bytes used by the factorization.
+    """
+    m, n = A.shape
+    G = np.dot(A, A.T) if transpose else np.dot(A.T, A)
 
     # add L2 regularization term 'lambda' = m * sigma**2
     np.fill_diagonal(G, G.diagonal() + m * sigma**2)
@@ -41,13 +40,115 @@ def cholesky(A, y, sigma, transpose=None):
     try:
         import scipy.linalg
         factor = scipy.linalg.cho_factor(G, overwrite_a=True)
-        x = scipy.linalg.cho_solve(factor, b)
+        solve = lambda b: scipy.linalg.cho_solve(factor, b)
     except ImportError:
         L = np.linalg.cholesky(G)
         L = np.linalg.inv(L.T)
-        x = np.dot(L, np.dot(L.T, b))
+        solve = lambda b: np.dot(L, np.dot(L.T, b))
+
+    return solve, G.nbytes
+
+
+class CholeskyCache(object):
+    """Reuses Cholesky factorizations between calls to `cholesky`.
+
+    Decoded connections from the same ensemble usually share the same
+    evaluation points, and therefore the same activity matrix. While a cache
+    is active (i.e., inside its ``with`` block), `cholesky` factors each
+    distinct regularized Gram matrix only once; solving for the targets of
+    later connections then only requires the triangular solves. Caches are
+    only active in the thread that entered them, so models can be built in
+    several threads at once.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum memory used by stored factorizations. When exceeded, the least
+        recently used factorizations are discarded. Default: 256 MB.
+    """
+
+    # stack of the active caches of each thread
+    _local = threading.local()
+
+    def __init__(self, max_bytes=256 * 1024**2):
+        self.max_bytes = max_bytes
+        self._factors = OrderedDict()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._factors)
+
+    def __enter__(self):
+        self._active_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._active_stack().remove(self)
+
+    @classmethod
+    def _active_stack(cls):
+        if not hasattr(cls._local, 'stack'):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def active(cls):
+        """The innermost cache active in this thread, or None if none is."""
+        stack = cls._active_stack()
+        return stack[-1] if len(stack) > 0 else None
+
+    def clear(self):
+        self._factors.clear()
+        self._nbytes = 0
+
+    def factor(self, A, sigma, transpose):
+        """Return a solve function for the regularized Gram matrix of ``A``.
+        """
+        h = hashlib.sha1()
+        h.update(np.ascontiguousarray(A).data)
+        h.update(np.ascontiguousarray(
+            np.atleast_1d(sigma), dtype=np.float64).data)
+        h.update(struct.pack('?qq', bool(transpose), *A.shape))
+        key = h.hexdigest()
+
+        if key in self._factors:
+            # re-insert to mark as most recently used
+            solve, nbytes = self._factors.pop(key)
+        else:
+            solve, nbytes = _gram_factor(A, sigma, transpose)
+            self._nbytes += nbytes
+        self._factors[key] = solve, nbytes
+
+        while self._nbytes > self.max_bytes and len(self._factors) > 1:
+            _, (_, old_nbytes) = self._factors.popitem(last=False)
+            self._nbytes -= old_nbytes
+
+        return solve
+
+
+def cholesky(A, y, sigma, transpose=None):
+    """Solve the least-squares system using the Cholesky decomposition.
+
+    If a `CholeskyCache` is active, the factorization is taken from the cache.
+    """
+    m, n = A.shape
+    if transpose is None:
+        # transpose if matrix is fat, but not if we have sigmas for each neuron
+        transpose = m < n and sigma.size == 1
+
+    cache = CholeskyCache.active()
+    if cache is None:
+        solve, _ = _gram_factor(A, sigma, transpose)
+    else:
+        solve = cache.factor(A, sigma, transpose)
+
+    if transpose:
+        # substitution: x = A'*xbar, G*xbar = b where G = A*A' + lambda*I
+        x = np.dot(A.T, solve(y))
+    else:
+        # multiplication by A': G*x = A'*b where G = A'*A + lambda*I
+        x = solve(np.dot(A.T, y))
 
-    x = np.dot(A.T, x) if transpose else x
     info = {'rmses': npext.rms(y - np.dot(A, x), axis=0)}
     return x, info
 
@@ -188,6 +289,77 @@ def block_conjgrad(A, Y, sigma, X0=None, tol=1e-2):
     return X if matrix_in else X.flatten(), info
 
 
+def randomized_svd(A, Y, sigma, rng=np.random, rank=None, tol=3e-3,
+                   n_oversamples=10, n_power_iter=2):
+    """Solve the least-squares system using a randomized truncated SVD.
+
+    The range of ``A`` is found by multiplying it with a Gaussian random
+    matrix [1]_, so only products with ``A`` and the SVD of a small matrix
+    are needed, instead of forming and factoring the Gram matrix.
+
+    Parameters
+    ----------
+    rank : int, optional
+        Number of singular vectors to keep. If None (default), the rank is
+        doubled until the smallest singular value found drops below ``tol``
+        times the largest one.
+    tol : float, optional
+        Singular values smaller than ``tol`` times the largest one are
+        discarded when ``rank`` is None.
+    n_oversamples : int, optional
+        Additional random vectors used to improve the range estimate.
+    n_power_iter : int, optional
+        Number of power iterations used to sharpen the range estimate.
+
+    References
+    ----------
+    .. [1] Halko, N., Martinsson, P.G., and Tropp, J.A. (2011). Finding
+       structure with randomness: Probabilistic algorithms for constructing
+       approximate matrix decompositions. SIAM Review, 53(2):217-288.
+    """
+    Y, m, n, d, matrix_in = _format_system(A, Y)
+    max_rank = min(m, n)
+
+    def orthonormalize(X, Q):
+        # remove the components already in Q, and orthonormalize the rest
+        for _ in range(2):  # twice, to counter loss of orthogonality
+            X -= np.dot(Q, np.dot(Q.T, X))
+        return np.linalg.qr(X)[0]
+
+    # Find the range of A block by block, so that increasing the rank only
+    # requires sketching the new columns (cf. Halko et al., Algorithm 4.2)
+    Q = np.zeros((m, 0))
+    B = np.zeros((0, n))
+    k = min(50 if rank is None else rank, max_rank)
+    while True:
+        n_new = min(k + n_oversamples, max_rank) - Q.shape[1]
+        Qi = np.dot(A, rng.normal(size=(n, n_new)))
+        for _ in range(n_power_iter):
+            Qi = orthonormalize(Qi, Q)
+            Qi = np.dot(A, np.linalg.qr(np.dot(A.T, Qi))[0])
+        Qi = orthonormalize(Qi, Q)
+        Q = np.hstack([Q, Qi])
+        B = np.vstack([B, np.dot(Qi.T, A)])
+        U, s, V = np.linalg.svd(B, full_matrices=False)
+
+        if rank is not None or k >= max_rank or s[k - 1] <= tol * s[0]:
+            break
+        k = min(2 * k, max_rank)
+        if Q.shape[1] >= max_rank:
+            break  # the oversampled sketch already spans the whole range
+
+    if rank is None:
+        k = max(np.sum(s[:k] > tol * s[0]), 1)
+    U, s, V = np.dot(Q, U[:, :k]), s[:k], V[:k]
+
+    # Tikhonov regularization with 'lambda' = m * sigma**2, as in `cholesky`
+    X = np.dot(V.T, (s / (s**2 + m * sigma**2))[:, None] * np.dot(U.T, Y))
+    info = {'rmses': npext.rms(Y - np.dot(A, X), axis=0),
+            'rank': k,
+            'singular_values': s}
+    return X if matrix_in else X.flatten(), info
+
+
 def _format_system(A, Y):
     m, n = A.shape
     matrix_in = Y.ndim > 1
@@ -196,11 +368,85 @@ def _format_system(A, Y):
     return Y, m, n, d, matrix_in
 
 
+def _nnls_columns(A, Y):
+    import scipy.optimize
+
+    X = np.zeros((A.shape[1], Y.shape[1]))
+    residuals = np.zeros(Y.shape[1])
+    for i in range(Y.shape[1]):
+        X[:, i], residuals[i] = scipy.optimize.nnls(A, Y[:, i])
+    return X, residuals
+
+
+def _elasticnet_columns(A, Y, alpha, l1_ratio):
+    import sklearn.linear_model
+
+    model = sklearn.linear_model.ElasticNet(
+        alpha=alpha, l1_ratio=l1_ratio, fit_intercept=False, max_iter=1000)
+    model.fit(A, Y)
+    return model.coef_.T.reshape((A.shape[1], Y.shape[1]))
+
+
+# pools solving columns in parallel, made when first needed and then reused
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(backend, n_workers):
+    """A pool of ``n_workers`` threads or processes, shared between solves."""
+    import multiprocessing.pool
+
+    # process pools cannot be used by a forked child, so each has its own
+    key = (backend, n_workers, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = (multiprocessing.pool.ThreadPool(n_workers)
+                           if backend == 'thread' else
+                           multiprocessing.Pool(n_workers))
+        return _pools[key]
+
+
+def _solve_columns(solve, A, Y, n_jobs=1, backend='thread'):
+    """Call ``solve(A, Y_i)`` on blocks ``Y_i`` of the columns of ``Y``.
+
+    With ``n_jobs > 1`` the blocks are solved in parallel on a pool of
+    threads or processes (with ``n_jobs < 1``, one per CPU), which is kept
+    for later calls with the same ``n_jobs`` and ``backend``. Each column
+    is solved independently of the others, so the results do not depend
+    on how the columns are split.
+
+    Returns
+    -------
+    list
+        The results of ``solve`` for each block, in order.
+    """
+    import multiprocessing
+
+    d = Y.shape[1]
+    if n_jobs < 1:
+        n_jobs = multiprocessing.cpu_count()
+    if n_jobs == 1 or d <= 1:
+        return [solve(A, Y)]
+
+    blocks = [Y[:, cols] for cols in
+              np.array_split(np.arange(d), min(n_jobs, d))]
+    return _get_pool(backend, n_jobs).map(functools.partial(solve, A), blocks)
+
+
 class Solver(with_metaclass(DocstringInheritor)):
     """
     Decoder or weight solver.
     """
 
+    # Whether solving for weights is the same as solving for decoders and
+    # multiplying them by the encoders. The builder then solves for weights
+    # in the (smaller) decoded space.
+    compositional = False
+
+    # Attributes that only affect how the solution is computed, not what it
+    # is. They are not part of the hash or of the decoder cache key.
+    _execution_attrs = ()
+
     def __call__(self, A, Y, rng=None, E=None):
         """Call the solver.
 
@@ -241,7 +487,8 @@ class Solver(with_metaclass(DocstringInheritor)):
             return Y
 
     def __hash__(self):
-        items = list(self.__dict__.items())
+        items = [(k, v) for k, v in self.__dict__.items()
+                 if k not in self._execution_attrs]
         items.sort(key=lambda item: item[0])
 
         hashes = []
@@ -271,6 +518,8 @@ class Solver(with_metaclass(DocstringInheritor)):
 class Lstsq(Solver):
     """Unregularized least-squares"""
 
+    compositional = True
+
     def __init__(self, weights=False, rcond=0.01):
         """
         weights : boolean, optional
@@ -293,6 +542,8 @@ class Lstsq(Solver):
 class _LstsqNoiseSolver(Solver):
     """Base for least-squares solvers with noise"""
 
+    compositional = True
+
     def __init__(self, weights=False, noise=0.1, solver=cholesky, **kwargs):
         """
         weights : boolean, optional
@@ -334,7 +585,10 @@ class LstsqMultNoise(_LstsqNoiseSolver):
 class _LstsqL2Solver(Solver):
     """Base for L2-regularized least-squares solvers"""
 
-    def __init__(self, weights=False, reg=0.1, solver=cholesky, **kwargs):
+    compositional = True
+
+    def __init__(self, weights=False, reg=0.1, solver=cholesky,
+                 warm_start=False, **kwargs):
         """
         weights : boolean, optional
             If false solve for decoders (default), otherwise solve for weights.
@@ -342,28 +596,49 @@ class _LstsqL2Solver(Solver):
             Amount of regularization, as a fraction of the neuron activity.
         solver : callable, optional
             Subsolver to use for solving the least-squares problem.
+        warm_start : boolean, optional
+            If true, start the iterative `solver` (e.g. `conjgrad` or
+            `block_conjgrad`) from the closest solution in the decoder cache
+            for the same activities. This saves iterations when, for example,
+            sweeping the regularization or changing the function slightly.
+            Only cached decoders are used as initial guesses, also when
+            solving for weights; cached weights are not.
         kwargs
             Additional arguments passed to `solver`.
         """
+        try:
+            takes_x0 = 'X0' in getargspec(solver).args
+        except TypeError:
+            takes_x0 = True  # cannot tell, e.g. for partials on Python 2
+        if warm_start and not takes_x0:
+            raise ValueError("Solver %r does not take an initial guess 'X0' "
+                             "and cannot be warm-started" % solver)
         self.weights = weights
         self.reg = reg
         self.solver = solver
+        self.warm_start = warm_start
         self.kwargs = kwargs
 
+    def _solve(self, A, Y, sigma, X0):
+        kwargs = dict(self.kwargs)
+        if X0 is not None and self.warm_start:
+            kwargs['X0'] = X0
+        return self.solver(A, Y, sigma, **kwargs)
+
 
 class LstsqL2(_LstsqL2Solver):
     """Least-squares with L2 regularization."""
 
-    def __call__(self, A, Y, rng=None, E=None):
+    def __call__(self, A, Y, rng=None, E=None, X0=None):
         sigma = self.reg * A.max()
-        X, info = self.solver(A, Y, sigma, **self.kwargs)
+        X, info = self._solve(A, Y, sigma, X0)
         return self.mul_encoders(X, E), info
 
 
 class LstsqL2nz(_LstsqL2Solver):
     """Least-squares with L2 regularization on non-zero components."""
 
-    def __call__(self, A, Y, rng=None, E=None):
+    def __call__(self, A, Y, rng=None, E=None, X0=None):
         # Compute the equivalent noise standard deviation. This equals the
         # base amplitude (noise_amp times the overall max activation) times
         # the square-root of the fraction of non-zero components.
@@ -373,16 +648,84 @@ class LstsqL2nz(_LstsqL2Solver):
         # we have to make sigma != 0 for numeric reasons.
         sigma[sigma == 0] = sigma.max()
 
-        X, info = self.solver(A, Y, sigma, **self.kwargs)
+        X, info = self._solve(A, Y, sigma, X0)
         return self.mul_encoders(X, E), info
 
 
-class LstsqL1(Solver):
+class LstsqRandomizedSVD(Solver):
+    """Least-squares with L2 regularization using a randomized SVD.
+
+    Only products with the activity matrix are needed, so this scales to
+    much larger ensembles than `LstsqL2`, which factors an ``(n, n)`` Gram
+    matrix. See `randomized_svd` for details.
+    """
+
+    compositional = True
+
+    def __init__(self, weights=False, reg=0.1, rank=None, tol=3e-3,
+                 n_oversamples=10, n_power_iter=2):
+        """
+        weights : boolean, optional
+            If false solve for decoders (default), otherwise solve for weights.
+        reg : float, optional
+            Amount of regularization, as a fraction of the neuron activity.
+        rank : int, optional
+            Number of singular vectors to keep. If None (default), the rank
+            is chosen to satisfy ``tol``.
+        tol : float, optional
+            Relative size of the smallest singular value kept.
+        n_oversamples : int, optional
+            Additional random vectors used to improve the range estimate.
+        n_power_iter : int, optional
+            Number of power iterations used to sharpen the range estimate.
+        """
+        self.weights = weights
+        self.reg = reg
+        self.rank = rank
+        self.tol = tol
+        self.n_oversamples = n_oversamples
+        self.n_power_iter = n_power_iter
+
+    def __call__(self, A, Y, rng=None, E=None):
+        rng = np.random if rng is None else rng
+        sigma = self.reg * A.max()
+        X, info = randomized_svd(
+            A, Y, sigma, rng=rng, rank=self.rank, tol=self.tol,
+            n_oversamples=self.n_oversamples, n_power_iter=self.n_power_iter)
+        return self.mul_encoders(X, E), info
+
+
+class _ColumnwiseSolver(Solver):
+    """Base for solvers that solve for each column of the targets separately.
+    """
+
+    _execution_attrs = ('n_jobs', 'backend')
+
+    def __init__(self, weights=False, n_jobs=1, backend='thread'):
+        """
+        weights : boolean, optional
+            If false solve for decoders (default), otherwise solve for weights.
+        n_jobs : int, optional
+            Number of columns to solve in parallel. If less than one, use one
+            job per CPU. Default: 1 (no parallelism).
+        backend : 'thread' or 'process', optional
+            Whether to solve in parallel with a pool of threads (default)
+            or a pool of processes.
+        """
+        if backend not in ('thread', 'process'):
+            raise ValueError("backend must be 'thread' or 'process' (got %r)"
+                             % backend)
+        self.weights = weights
+        self.n_jobs = n_jobs
+        self.backend = backend
+
+
+class LstsqL1(_ColumnwiseSolver):
     """Least-squares with L1 and L2 regularization (elastic net).
 
     This method is well suited for creating sparse decoders or weight matrices.
     """
-    def __init__(self, weights=False, l1=1e-4, l2=1e-6):
+    def __init__(self, weights=False, l1=1e-4, l2=1e-6, **kwargs):
         """
         weights : boolean, optional
             If false solve for decoders (default), otherwise solve for weights.
@@ -390,15 +733,20 @@ class LstsqL1(Solver):
             Amount of L1 regularization.
         l2 : float, optional
             Amount of L2 regularization.
+        n_jobs : int, optional
+            Number of columns to solve in parallel. If less than one, use one
+            job per CPU. Default: 1 (no parallelism).
+        backend : 'thread' or 'process', optional
+            Whether to solve in parallel with a pool of threads (default)
+            or a pool of processes.
         """
         import sklearn.linear_model  # noqa F401, import to check existence
         assert sklearn.linear_model
-        self.weights = weights
+        super(LstsqL1, self).__init__(weights, **kwargs)
         self.l1 = l1
         self.l2 = l2
 
     def __call__(self, A, Y, rng=None, E=None):
-        import sklearn.linear_model
         Y = self.mul_encoders(Y, E)
 
         # TODO: play around with regularization constants (I just guessed).
@@ -412,11 +760,12 @@ class LstsqL1(Solver):
         l1_ratio = a / (a + b)
 
         # --- solve least-squares A * X = Y
-        model = sklearn.linear_model.ElasticNet(
-            alpha=alpha, l1_ratio=l1_ratio, fit_intercept=False, max_iter=1000)
-        model.fit(A, Y)
-        X = model.coef_.T
-        X.shape = (A.shape[1], Y.shape[1]) if Y.ndim > 1 else (A.shape[1],)
+        Y, m, n, d, matrix_in = _format_system(A, Y)
+        solve = functools.partial(
+            _elasticnet_columns, alpha=alpha, l1_ratio=l1_ratio)
+        X = np.hstack(_solve_columns(solve, A, Y, self.n_jobs, self.backend))
+        if not matrix_in:
+            X, Y = X.flatten(), Y.flatten()
         infos = {'rmses': npext.rms(Y - np.dot(A, X), axis=0)}
         return X, infos
 
@@ -470,30 +819,34 @@ class LstsqDrop(Solver):
         return X if matrix_in else X.flatten(), info
 
 
-class Nnls(Solver):
+class Nnls(_ColumnwiseSolver):
     """Non-negative least-squares without regularization.
 
     Similar to `lstsq`, except the output values are non-negative.
     """
-    def __init__(self, weights=False):
+    def __init__(self, weights=False, **kwargs):
         """
         weights : boolean, optional
             If false solve for decoders (default), otherwise solve for weights.
+        n_jobs : int, optional
+            Number of columns to solve in parallel. If less than one, use one
+            job per CPU. Default: 1 (no parallelism).
+        backend : 'thread' or 'process', optional
+            Whether to solve in parallel with a pool of threads (default)
+            or a pool of processes.
         """
         import scipy.optimize  # import here too to throw error early
         assert scipy.optimize
-        self.weights = weights
+        super(Nnls, self).__init__(weights, **kwargs)
 
     def __call__(self, A, Y, rng=None, E=None):
-        import scipy.optimize
-
         Y, m, n, d, matrix_in = _format_system(A, Y)
         Y = self.mul_encoders(Y, E)
 
-        X = np.zeros((n, d))
-        residuals = np.zeros(d)
-        for i in range(d):
-            X[:, i], residuals[i] = scipy.optimize.nnls(A, Y[:, i])
+        results = _solve_columns(
+            _nnls_columns, A, Y, self.n_jobs, self.backend)
+        X = np.hstack([x for x, _ in results])
+        residuals = np.hstack([r for _, r in results])
 
         info = {'rmses': npext.rms(Y - np.dot(A, X), axis=0),
                 'residuals': residuals}
@@ -505,14 +858,20 @@ class NnlsL2(Nnls):
 
     Similar to `lstsq_L2`, except the output values are non-negative.
     """
-    def __init__(self, weights=False, reg=0.1):
+    def __init__(self, weights=False, reg=0.1, **kwargs):
         """
         weights : boolean, optional
             If false solve for decoders (default), otherwise solve for weights.
         reg : float, optional
             Amount of regularization, as a fraction of the neuron activity.
+        n_jobs : int, optional
+            Number of columns to solve in parallel. If less than one, use one
+            job per CPU. Default: 1 (no parallelism).
+        backend : 'thread' or 'process', optional
+            Whether to solve in parallel with a pool of threads (default)
+            or a pool of processes.
         """
-        super(NnlsL2, self).__init__(weights)
+        super(NnlsL2, self).__init__(weights, **kwargs)
         self.reg = reg
 
     def __call__(self, A, Y, rng=None, E=None):
@@ -529,14 +888,20 @@ class NnlsL2nz(Nnls):
 
     Similar to `lstsq_L2nz`, except the output values are non-negative.
     """
-    def __init__(self, weights=False, reg=0.1):
+    def __init__(self, weights=False, reg=0.1, **kwargs):
         """
         weights : boolean, optional
             If false solve for decoders (default), otherwise solve for weights.
         reg : float, optional
             Amount of regularization, as a fraction of the neuron activity.
+        n_jobs : int, optional
+            Number of columns to solve in parallel. If less than one, use one
+            job per CPU. Default: 1 (no parallelism).
+        backend : 'thread' or 'process', optional
+            Whether to solve in parallel with a pool of threads (default)
+            or a pool of processes.
         """
-        super(NnlsL2nz, self).__init__(weights)
+        super(NnlsL2nz, self).__init__(weights, **kwargs)
         self.reg = reg
 
     def __call__(self, A, Y, rng=None, E=None):
@@ -1,11 +1,10 @@
-import collections
 import functools
 
 import numpy as np
 
 from nengo.params import Parameter, Unconfigurable
 from nengo.utils.compat import is_number
-from nengo.utils.filter_design import cont2discrete
+from nengo.utils.filter_design import cont2discrete, tf2ss
 
 
 class Synapse(object):
@@ -51,31 +50,72 @@ class LinearFilter(Synapse):
         output += b * signal
 
     @staticmethod
-    def general_step(signal, output, x, y, num, den):
-        """Filter an LTI system with the given transfer function.
+    def state_space_step(A, B, C, D, output):
+        """Make a step function simulating a discrete state-space system.
 
-        Implements a discrete-time LTI system using the difference equation
-        [1]_ for the given transfer function (num, den).
-
-        References
-        ----------
-        .. [1] http://en.wikipedia.org/wiki/Digital_filter#Difference_equation
+        The system ``(A, B, C, D)`` is given in the form returned by
+        `LinearFilter.state_space`, and is applied to each element of
+        ``output`` independently. All buffers are allocated here and updated
+        in place, so calling the step function does not allocate memory.
         """
+        n = output.size
+        u = np.zeros(output.shape)
+        u_flat = u.reshape(n)
+        du = np.zeros(n)
+        x = np.zeros((len(A), n))
+        x_new = np.zeros_like(x)
+        bu = np.zeros_like(x)
+        d = D[0, 0]
+
+        # write straight into the output if it can be viewed as a row
+        inplace = isinstance(output, np.ndarray) and output.flags.c_contiguous
+        y = output.reshape((1, n)) if inplace else np.zeros((1, n))
+        y_out = y.reshape(output.shape)
+
+        def step(signal):
+            u[...] = signal
+            np.dot(C, x, out=y)
+            np.multiply(u_flat, d, out=du)
+            np.add(y[0], du, out=y[0])
+            if not inplace:
+                output[...] = y_out
+            np.dot(A, x, out=x_new)
+            np.multiply(B, u_flat, out=bu)
+            np.add(x_new, bu, out=x)
 
-        output[...] = 0
+        return step
 
-        x.appendleft(np.array(signal))
-        for k, xk in enumerate(x):
-            output += num[k] * xk
-        for k, yk in enumerate(y):
-            output -= den[k] * yk
-        y.appendleft(np.array(output))
+    def discretize(self, dt, method='zoh'):
+        """Coefficients of the filter's difference equation.
 
-    def make_step(self, dt, output, method='zoh'):
+        Returns ``(num, den)``, where ``num[k]`` weights the input ``k`` steps
+        ago and ``den[k]`` the output ``k + 1`` steps ago (the leading 1 of
+        the discrete denominator is dropped).
+        """
         num, den, _ = cont2discrete((self.num, self.den), dt, method=method)
         num = num.flatten()
         num = num[1:] if num[0] == 0 else num
         den = den[1:]  # drop first element (equal to 1)
+        return num, den
+
+    def state_space(self, dt, method='zoh'):
+        """Discrete state-space matrices ``(A, B, C, D)`` of the filter.
+
+        With state ``x`` and input ``u``, the output at each step is
+        ``y = C x + D u``, after which the state becomes ``A x + B u``.
+        ``x`` has one row per filter order, so ``A`` is always square and
+        ``B``, ``C`` and ``D`` are always two-dimensional.
+        """
+        num, den = self.discretize(dt, method=method)
+        order = max(len(num) - 1, len(den))
+        A, B, C, D = tf2ss(
+            np.hstack([num, np.zeros(order - len(num) + 1)]),
+            np.hstack([[1.], den, np.zeros(order - len(den))]))
+        return (np.reshape(A, (order, order)), np.reshape(B, (order, 1)),
+                np.reshape(C, (1, order)), np.reshape(D, (1, 1)))
+
+    def make_step(self, dt, output, method='zoh'):
+        num, den = self.discretize(dt, method=method)
 
         if len(num) == 1 and len(den) == 0:
             return functools.partial(
@@ -84,10 +124,8 @@ class LinearFilter(Synapse):
             return functools.partial(
                 LinearFilter.simple_step, output=output, a=den[0], b=num[0])
         else:
-            x = collections.deque(maxlen=len(num))
-            y = collections.deque(maxlen=len(den))
-            return functools.partial(LinearFilter.general_step,
-                                     output=output, x=x, y=y, num=num, den=den)
+            A, B, C, D = self.state_space(dt, method=method)
+            return LinearFilter.state_space_step(A, B, C, D, output)
 
 
 class Lowpass(LinearFilter):
@@ -105,12 +143,11 @@ class Lowpass(LinearFilter):
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, self.tau)
 
-    def make_step(self, dt, output):
+    def discretize(self, dt, method='zoh'):
         # if tau < 0.03 * dt, exp(-dt / tau) < 1e-14, so just make it zero
         if self.tau <= .03 * dt:
-            return functools.partial(
-                LinearFilter.no_den_step, output=output, b=1.)
-        return super(Lowpass, self).make_step(dt, output)
+            return np.array([1.]), np.array([])
+        return super(Lowpass, self).discretize(dt, method=method)
 
 
 class Alpha(LinearFilter):
@@ -139,12 +176,11 @@ class Alpha(LinearFilter):
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, self.tau)
 
-    def make_step(self, dt, output):
+    def discretize(self, dt, method='zoh'):
         # if tau < 0.03 * dt, exp(-dt / tau) < 1e-14, so just make it zero
         if self.tau <= .03 * dt:
-            return functools.partial(
-                LinearFilter.no_den_step, output=output, b=1.)
-        return super(Alpha, self).make_step(dt, output)
+            return np.array([1.]), np.array([])
+        return super(Alpha, self).discretize(dt, method=method)
 
 
 class Triangle(Synapse):
@@ -167,21 +203,138 @@ class Triangle(Synapse):
 
         # Minimal multiply implementation finds the difference between
         # coefficients and subtracts a scaled signal at each time step.
+        # The last `n_taps` scaled signals are kept in a circular buffer,
+        # along with their running sum, so each step takes constant time.
         n0, ndiff = num[0], num[-1]
-        x = collections.deque(maxlen=n_taps)
-
-        def step(signal, output=output, x=x, num=num):
-            output[...] += n0 * signal
-            for xk in x:
-                output -= xk
-            x.appendleft(ndiff * signal)
+        x = np.zeros((n_taps,) + output.shape)
+        x_sum = np.zeros(output.shape)
+        tmp = np.zeros(output.shape)
+        index = [0]
+
+        def step(signal, output=output, x=x, x_sum=x_sum):
+            np.multiply(signal, n0, out=tmp)
+            output += tmp
+            output -= x_sum
+
+            i = index[0]
+            x_sum -= x[i]
+            np.multiply(signal, ndiff, out=x[i])
+            x_sum += x[i]
+            index[0] = (i + 1) % n_taps
+            if index[0] == 0:
+                # recompute the sum once per cycle, so rounding errors
+                # in the running sum cannot accumulate
+                np.sum(x, axis=0, out=x_sum)
 
         return step
 
 
+def _lfilter_coefficients(synapse, dt, method='zoh'):
+    """Difference equation coefficients ``(b, a)`` of equal length >= 2."""
+    num, den = synapse.discretize(dt, method=method)
+    n = max(len(num), len(den) + 1, 2)
+    b = np.hstack([num, np.zeros(n - len(num))])
+    a = np.hstack([[1.], den, np.zeros(n - len(den) - 1)])
+    return b, a
+
+
+def _lfilter_numpy(b, a, block_size=128):
+    """Make an lfilter-like function using NumPy block recursion.
+
+    The filter is written in the state-space form of the transposed direct
+    form II used by ``scipy.signal.lfilter``, so the state has the same
+    meaning as its ``zi``. Each block of ``block_size`` steps is filtered with
+    a few matrix products: the outputs are the impulse response convolved
+    with the block's input plus the free response of the initial state.
+    """
+    n = len(a) - 1
+    A = np.eye(n, k=1)
+    A[:, 0] = -a[1:]
+    B = b[1:] - a[1:] * b[0]
+    C = np.eye(1, n)[0]
+    D = b[0]
+
+    # powers[i] = A**i, so that C A**i are the free responses and
+    # A**i B the impulse responses of the state
+    powers = [np.eye(n)]
+    for _ in range(block_size):
+        powers.append(np.dot(A, powers[-1]))
+    CA = np.array([np.dot(C, p) for p in powers])
+    AB = np.array([np.dot(p, B) for p in powers])
+
+    h = np.hstack([[D], np.dot(CA[:-1], B)])
+    k = np.arange(block_size)
+    lag = k[:, None] - k[None, :]
+    T = np.where(lag >= 0, h[np.maximum(lag, 0)], 0.)
+
+    def lfilter(x, z):
+        x2 = x.reshape((len(x), -1))
+        y = np.empty_like(x2, dtype=np.float64)
+        z2 = z.reshape((n, -1))
+        for i in range(0, len(x2), block_size):
+            u = x2[i:i + block_size]
+            m = len(u)
+            y[i:i + m] = np.dot(T[:m, :m], u) + np.dot(CA[:m], z2)
+            z2 = np.dot(powers[m], z2) + np.dot(AB[m - 1::-1].T, u)
+        return y.reshape(x.shape), z2.reshape(z.shape)
+
+    return lfilter
+
+
+def _make_lfilter(b, a):
+    try:
+        import scipy.signal
+    except ImportError:
+        return _lfilter_numpy(b, a)
+    return lambda x, z: scipy.signal.lfilter(b, a, x, axis=0, zi=z)
+
+
+def _filt_linear(views, synapse, dt, x0=None, chunk_size=2**20,
+                 method='zoh'):
+    """Filter ``views`` in sequence along their first axis, carrying state.
+
+    The views are filtered in chunks of about ``chunk_size`` elements, so
+    that memory-mapped arrays are never loaded fully into memory.
+    """
+    b, a = _lfilter_coefficients(synapse, dt, method=method)
+    lfilter = _make_lfilter(b, a)
+
+    shape = views[0].shape[1:]
+    z = np.zeros((len(a) - 1,) + shape)
+    if x0 is not None:
+        # past outputs are all equal to `x0`, past inputs are zero
+        z -= np.cumsum(a[:0:-1])[::-1].reshape((-1,) + (1,) * len(shape)) * x0
+
+    n_rows = max(chunk_size // max(int(np.prod(shape)), 1), 1)
+    for view in views:
+        for i in range(0, len(view), n_rows):
+            view[i:i + n_rows], z = lfilter(view[i:i + n_rows], z)
+
+
+def _filt_steps(views, synapse, dt, x0=None):
+    """Filter ``views`` in sequence by stepping the synapse."""
+    if x0 is not None:
+        signal_out = np.array(x0)
+    else:
+        # signal_out is our buffer for the current filter state
+        signal_out = np.zeros_like(views[0][0])
+
+    step = synapse.make_step(dt, signal_out)
+
+    for view in views:
+        for i, signal_in in enumerate(view):
+            step(signal_in)
+            view[i] = signal_out
+
+
 def filt(signal, synapse, dt, axis=0, x0=None, copy=True):
     """Filter ``signal`` with ``synapse``.
 
+    Linear filters are applied with ``scipy.signal.lfilter`` if available,
+    otherwise with a vectorized NumPy implementation; in both cases, the data
+    is processed in chunks along ``axis``, so memory-mapped arrays can be
+    filtered in-place (with ``copy=False``) without loading them fully.
+
     Parameters
     ----------
     signal : array_like
@@ -203,21 +356,14 @@ def filt(signal, synapse, dt, axis=0, x0=None, copy=True):
     filtered = np.array(signal, copy=copy)
     filt_view = np.rollaxis(filtered, axis=axis)  # rolled view on filtered
 
-    # --- buffer method
-    if x0 is not None:
-        if x0.shape != filt_view[0].shape:
-            raise ValueError("'x0' with shape %s must have shape %s" %
-                             (x0.shape, filt_view[0].shape))
-        signal_out = np.array(x0)
-    else:
-        # signal_out is our buffer for the current filter state
-        signal_out = np.zeros_like(filt_view[0])
+    if x0 is not None and x0.shape != filt_view[0].shape:
+        raise ValueError("'x0' with shape %s must have shape %s" %
+                         (x0.shape, filt_view[0].shape))
 
-    step = synapse.make_step(dt, signal_out)
-
-    for i, signal_in in enumerate(filt_view):
-        step(signal_in)
-        filt_view[i] = signal_out
+    if isinstance(synapse, LinearFilter):
+        _filt_linear([filt_view], synapse, dt, x0=x0)
+    else:
+        _filt_steps([filt_view], synapse, dt, x0=x0)
 
     return filtered
 
@@ -248,18 +394,13 @@ def filtfilt(signal, synapse, dt, axis=0, copy=True):
 
     filtered = np.array(signal, copy=copy)
     filt_view = np.rollaxis(filtered, axis=axis)
-    signal_out = np.zeros_like(filt_view[0])
-    step = synapse.make_step(dt, signal_out)
 
-    for i, signal_in in enumerate(filt_view):
-        step(signal_in)
-        filt_view[i] = signal_out
-
-    # Flip the filt_view and filter again
-    filt_view = filt_view[::-1]
-    for i, signal_in in enumerate(filt_view):
-        step(signal_in)
-        filt_view[i] = signal_out
+    # Filter forward, then flip the filt_view and filter again
+    views = [filt_view, filt_view[::-1]]
+    if isinstance(synapse, LinearFilter):
+        _filt_linear(views, synapse, dt)
+    else:
+        _filt_steps(views, synapse, dt)
 
     return filtered
 
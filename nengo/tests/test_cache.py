@@ -1,4 +1,5 @@
 import errno
+import functools
 import os
 
 import numpy as np
@@ -8,6 +9,7 @@ import pytest
 import nengo
 from nengo.cache import (
     DecoderCache, Fingerprint, get_fragment_size, NoDecoderCache)
+from nengo.solvers import block_conjgrad, conjgrad, LstsqL2
 from nengo.utils.compat import int_types
 from nengo.utils.testing import Timer
 
@@ -79,6 +81,16 @@ def test_decoder_cache(tmpdir):
     assert SolverMock.n_calls[another_solver] == 1
 
 
+def test_decoder_cache_partial_solver(tmpdir):
+    """Solvers whose arguments cannot be inspected are cached too."""
+    cache = DecoderCache(cache_dir=str(tmpdir))
+    solver_mock = SolverMock('partial_solver')
+    solver = functools.partial(solver_mock)
+    for _ in range(2):
+        cache.wrap_solver(solver)(**get_solver_test_args())
+    assert SolverMock.n_calls[solver_mock] == 1
+
+
 def test_corrupted_decoder_cache(tmpdir):
     cache_dir = str(tmpdir)
 
@@ -204,6 +216,56 @@ def test_decoder_cache_with_E_argument_to_solver(tmpdir):
     assert solver_info1 == solver_info2
 
 
+@pytest.mark.parametrize('subsolver', [conjgrad, block_conjgrad])
+def test_decoder_cache_warm_start(tmpdir, rng, subsolver, monkeypatch):
+    cache = DecoderCache(cache_dir=str(tmpdir.join('warm')))
+    cold_cache = DecoderCache(cache_dir=str(tmpdir.join('cold')))
+    neurons = nengo.LIFRate()
+    gain, bias = neurons.gain_bias(
+        rng.uniform(200, 400, size=200), rng.uniform(-1, 0.9, size=200))
+    encoders = nengo.dists.UniformHypersphere(surface=True).sample(
+        200, 2, rng=rng)
+    Y = nengo.dists.UniformHypersphere().sample(500, 2, rng=rng)
+    A = neurons.rates(np.dot(Y, encoders.T), gain, bias)
+
+    def solve(reg, warm_start, cache=cache):
+        solver = LstsqL2(
+            reg=reg, solver=subsolver, warm_start=warm_start, tol=1e-4)
+        return cache.wrap_solver(solver)(A, Y, rng=rng)
+
+    warm_starts = []
+    get_warm_start = cache._get_warm_start
+
+    def record_warm_start(*args):
+        X0 = get_warm_start(*args)
+        warm_starts.append(X0)
+        return X0
+    monkeypatch.setattr(cache, '_get_warm_start', record_warm_start)
+
+    # the solution for 0.11 is only cached in the other cache, so the warm
+    # start must come from the solution for 0.1
+    solve(0.1, False)
+    X_cold, info_cold = solve(0.11, False, cache=cold_cache)
+    X_warm, info_warm = solve(0.11, True)
+
+    assert warm_starts[0] is None and warm_starts[1] is not None
+    assert np.all(info_warm['iterations'] < info_cold['iterations'])
+    assert np.allclose(X_warm, X_cold, atol=1e-7)
+
+    # solutions for other activities are not used
+    cache.invalidate()
+    solve(0.1, False)
+    _, info = cache.wrap_solver(LstsqL2(
+        reg=0.11, solver=subsolver, warm_start=True, tol=1e-4))(
+            A + 1e-3, Y, rng=rng)
+    assert np.all(info['iterations'] >= info_warm['iterations'])
+
+
+def test_warm_start_needs_initial_guess():
+    with pytest.raises(ValueError):
+        LstsqL2(warm_start=True)
+
+
 class DummyA(object):
     def __init__(self, attr=0):
         self.attr = attr
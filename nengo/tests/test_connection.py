@@ -3,6 +3,8 @@ import pytest
 
 import nengo
 import nengo.utils.numpy as npext
+from nengo.builder import Model
+from nengo.builder.ensemble import get_activities
 from nengo.connection import ConnectionSolverParam
 from nengo.dists import UniformHypersphere
 from nengo.solvers import LstsqL2
@@ -285,6 +287,118 @@ def test_weights(Simulator, nl, plt, seed):
     assert allclose(t, y, z, atol=0.1, buf=0.1, delay=0.01, plt=plt)
 
 
+def test_compositional_weights(RefSimulator, seed):
+    transform = np.array([[0.6, -0.4]])
+
+    with nengo.Network(seed=seed) as m:
+        a = nengo.Ensemble(30, dimensions=2)
+        b = nengo.Ensemble(40, dimensions=1)
+        conn = nengo.Connection(a, b, transform=transform,
+                                solver=LstsqL2(weights=True))
+
+    sim = RefSimulator(m)
+    built = sim.data[conn]
+
+    # solved in the decoded space, then multiplied by the encoders
+    activities = get_activities(sim.model, a, built.eval_points)
+    targets = np.dot(built.eval_points, transform.T)
+    weights, _ = LstsqL2(weights=True)(
+        activities, targets, E=sim.data[b].scaled_encoders.T)
+    assert built.solver_info['rmses'].shape == (1,)
+    assert np.allclose(built.decoders, weights.T)
+    assert built.transform == 1
+    assert sim.model.sig[conn]['decoders'].shape == (40, 30)
+
+    # if enabled, weights are applied as decoders and encoders, but the
+    # built params still have the full matrix
+    model = Model()
+    model.factor_transforms = True
+    sim = RefSimulator(m, model=model)
+    assert np.allclose(sim.data[conn].decoders, weights.T)
+    assert sim.data[conn].transform == 1
+    assert sim.model.sig[conn]['decoders'].shape == (1, 30)
+    assert sim.model.sig[conn]['transform'].shape == (40, 1)
+
+
+def test_low_rank_neuron_transform(Simulator, seed, rng, plt):
+    transform = np.dot(rng.normal(size=(80, 2)), rng.normal(size=(2, 100)))
+
+    with nengo.Network(seed=seed) as m:
+        u = nengo.Node(lambda t: np.sin(6 * t))
+        a = nengo.Ensemble(100, dimensions=1)
+        b = nengo.Node(size_in=80)
+        nengo.Connection(u, a)
+        conn = nengo.Connection(
+            a.neurons, b, transform=transform, synapse=0.005)
+        ap = nengo.Probe(a.neurons, synapse=0.005)
+        bp = nengo.Probe(b)
+
+    model = Model()
+    model.factor_transforms = True
+    sim = Simulator(m, model=model)
+    sim.run(0.2)
+
+    # the transform is applied as two dot products, but kept in full
+    assert sim.model.sig[conn]['decoders'].shape == (2, 100)
+    assert sim.model.sig[conn]['transform'].shape == (80, 2)
+    assert sim.data[conn].decoders is None
+    assert np.array_equal(sim.data[conn].transform, transform)
+
+    expected = np.dot(sim.data[ap], transform.T)
+    plt.plot(sim.trange(), expected[:, :3], 'k--')
+    plt.plot(sim.trange(), sim.data[bp][:, :3])
+    assert np.allclose(sim.data[bp], expected)
+
+
+def test_low_rank_neuron_transform_default(RefSimulator, seed, rng):
+    """Transforms are not factored unless enabled."""
+    transform = np.dot(rng.normal(size=(80, 2)), rng.normal(size=(2, 100)))
+    with nengo.Network(seed=seed) as m:
+        a = nengo.Ensemble(100, dimensions=1)
+        b = nengo.Node(size_in=80)
+        conn = nengo.Connection(a.neurons, b, transform=transform)
+
+    sim = RefSimulator(m)
+    assert 'decoders' not in sim.model.sig[conn]
+    assert sim.data[conn].decoders is None
+    assert np.array_equal(sim.data[conn].transform, transform)
+
+
+def test_low_rank_neuron_to_neuron_transform(RefSimulator, seed, rng):
+    transform = np.dot(rng.normal(size=(40, 1)), rng.normal(size=(1, 50)))
+    with nengo.Network(seed=seed) as m:
+        u = nengo.Node(lambda t: np.sin(6 * t))
+        a = nengo.Ensemble(50, dimensions=1)
+        b = nengo.Ensemble(40, dimensions=1)
+        nengo.Connection(u, a)
+        conn = nengo.Connection(a.neurons, b.neurons, transform=transform)
+        bp = nengo.Probe(b.neurons, 'voltage')
+
+    model = Model()
+    model.factor_transforms = True
+    sim0 = RefSimulator(m)
+    sim1 = RefSimulator(m, model=model)
+    assert sim1.model.sig[conn]['transform'].shape == (40, 1)
+    assert np.allclose(
+        sim1.data[conn].transform, transform * sim1.data[b].gain[:, None])
+    sim0.run(0.1)
+    sim1.run(0.1)
+    assert np.allclose(sim0.data[bp], sim1.data[bp])
+
+
+def test_full_rank_neuron_transform(RefSimulator, seed, rng):
+    with nengo.Network(seed=seed) as m:
+        a = nengo.Ensemble(50, dimensions=1)
+        b = nengo.Ensemble(40, dimensions=1)
+        transform = rng.normal(size=(40, 50))
+        conn = nengo.Connection(a.neurons, b.neurons, transform=transform)
+
+    sim = RefSimulator(m)
+    assert sim.data[conn].decoders is None
+    assert np.allclose(
+        sim.data[conn].transform, transform * sim.data[b].gain[:, None])
+
+
 def test_vector(Simulator, nl, plt, seed):
     N1, N2 = 50, 50
     transform = [-1, 0.5]
@@ -2,6 +2,9 @@ import numpy as np
 import pytest
 
 import nengo
+from nengo.builder import Model
+from nengo.cache import DecoderCache, NoDecoderCache
+from nengo.dists import Uniform
 from nengo.neurons import NeuronTypeParam
 from nengo.processes import WhiteSignal
 from nengo.solvers import LstsqL2nz
@@ -9,6 +12,7 @@ from nengo.utils.ensemble import tuning_curves
 from nengo.utils.matplotlib import implot, rasterplot
 from nengo.utils.neurons import rates_kernel
 from nengo.utils.numpy import rms, rmse
+from nengo.utils.testing import Timer
 
 
 def test_lif_builtin(rng):
@@ -36,6 +40,69 @@ def test_lif_builtin(rng):
     assert np.allclose(sim_rates, math_rates, atol=1, rtol=0.02)
 
 
+def lif_step_reference(lif, dt, J, spiked, voltage, refractory_time):
+    """Reference LIF step, allocating temporaries as needed."""
+    dV = -np.expm1(-dt / lif.tau_rc) * (J - voltage)
+    voltage += dV
+    voltage[voltage < lif.min_voltage] = lif.min_voltage
+    refractory_time -= dt
+    voltage *= (1 - refractory_time / dt).clip(0, 1)
+    spiked[:] = (voltage > 1) / dt
+    overshoot = (voltage[spiked > 0] - 1) / dV[spiked > 0]
+    spiketime = dt * (1 - overshoot)
+    voltage[spiked > 0] = 0
+    refractory_time[spiked > 0] = lif.tau_ref + spiketime
+
+
+@pytest.mark.parametrize('min_voltage', [0, -1])
+def test_lif_step_scratch(min_voltage, rng):
+    """Test that steps with and without scratch buffers are identical."""
+    n, dt = 500, 1e-3
+    lif = nengo.LIF(min_voltage=min_voltage)
+    J = rng.uniform(-2, 10, size=n)
+    scratch = lif.make_scratch(J.shape)
+
+    state0 = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    state1 = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    state2 = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    n_spikes = 0
+    for i in range(500):
+        Ji = J + rng.normal(scale=0.5, size=n)
+        lif_step_reference(lif, dt, Ji, *state0)
+        lif.step_math(dt, Ji, *state1, scratch=scratch)
+        lif.step_math(dt, Ji, *state2)
+        for x0, x1, x2 in zip(state0, state1, state2):
+            assert np.array_equal(x0, x1)
+            assert np.array_equal(x0, x2)
+        n_spikes += (state1[0] > 0).sum()
+    assert n_spikes > 0
+
+
+@pytest.mark.slow
+@pytest.mark.noassertions
+@pytest.mark.parametrize('n', [10**5, 10**6])
+def test_lif_step_speed(n, rng, logger):
+    dt, n_steps = 1e-3, 100
+    lif = nengo.LIF()
+    J = rng.uniform(-2, 10, size=n)
+    scratch = lif.make_scratch(J.shape)
+
+    state = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    with Timer() as t0:
+        for i in range(n_steps):
+            lif_step_reference(lif, dt, J, *state)
+
+    state = [np.zeros(n), np.zeros(n), np.zeros(n)]
+    with Timer() as t1:
+        for i in range(n_steps):
+            lif.step_math(dt, J, *state, scratch=scratch)
+
+    logger.info("%d neurons, %d steps", n, n_steps)
+    logger.info("reference: %0.3f s", t0.duration)
+    logger.info("with scratch buffers: %0.3f s (%0.2fx faster)",
+                t1.duration, t0.duration / t1.duration)
+
+
 def test_lif(Simulator, plt, rng, logger):
     """Test that the dynamic model approximately matches the rates"""
     dt = 0.001
@@ -356,3 +423,147 @@ def test_neurontypeparam():
     assert isinstance(inst.ntp, nengo.LIF)
     with pytest.raises(ValueError):
         inst.ntp = 'a'
+
+
+@pytest.mark.parametrize('neuron_type', [
+    nengo.LIFRate, nengo.LIF, nengo.AdaptiveLIF, nengo.Izhikevich])
+def test_per_neuron_params(Simulator, neuron_type, seed):
+    """Per-neuron parameters act like one neuron type per neuron."""
+    n = 5
+    params = {nengo.LIFRate: dict(tau_rc=np.linspace(0.01, 0.05, n)),
+              nengo.LIF: dict(tau_rc=np.linspace(0.01, 0.05, n),
+                              tau_ref=Uniform(0.001, 0.002)),
+              nengo.AdaptiveLIF: dict(tau_n=np.linspace(0.1, 1, n),
+                                      inc_n=0.02),
+              nengo.Izhikevich: dict(coupling=np.linspace(0.2, 0.25, n),
+                                     reset_voltage=Uniform(-70, -50))}
+    with nengo.Network(seed=seed) as net:
+        a = nengo.Ensemble(n, 1, neuron_type=neuron_type(
+            **params[neuron_type]))
+        nengo.Connection(nengo.Node(0.5), a)
+        p = nengo.Probe(a.neurons)
+
+    sim = Simulator(net)
+    sim.run(0.1)
+
+    built = sim.data[a.neurons]
+    assert np.all(np.isfinite(sim.data[p]))
+    gain, bias = sim.data[a].gain, sim.data[a].bias
+    x = np.linspace(-1, 1, 11)[:, None]
+    rates = built.rates(x, gain, bias)
+    for i in range(n):
+        single = built.copy()
+        for name in nengo.neurons.neuron_params(built):
+            value = getattr(built, name)
+            setattr(single, name, value if np.ndim(value) == 0 else value[i])
+        # per-neuron rates are fully simulated
+        single.rate_table_points = single.rate_tol = None
+        assert np.allclose(rates[:, i], single.rates(
+            x[:, 0], gain[i], bias[i]))
+
+        # gain and bias give each neuron its own max rate and intercept
+        g, b = single.gain_bias(sim.data[a].max_rates[i:i+1],
+                                sim.data[a].intercepts[i:i+1])
+        assert np.allclose([gain[i], bias[i]], [g[0], b[0]])
+
+
+def test_per_neuron_params_size(Simulator):
+    with nengo.Network() as net:
+        nengo.Ensemble(5, 1, neuron_type=nengo.LIF(tau_rc=[0.02, 0.03]))
+    with pytest.raises(ValueError):
+        Simulator(net)
+
+    with pytest.raises(ValueError):
+        nengo.LIF(tau_rc=[0.02, -0.01])
+    with pytest.raises(ValueError):
+        nengo.LIF(tau_rc=np.ones((2, 2)))
+
+
+def test_izhikevich_rate_table(tmpdir, rng):
+    izh = nengo.Izhikevich(coupling=0.25)
+    table = izh.rate_table()
+    assert izh.rate_table() is table
+    assert table.error < 5
+
+    J = rng.uniform(-40, 600, size=(50, 20))
+    sim_rates = izh.simulated_rates(J)
+    assert np.allclose(izh.rates(J, 1, 0), sim_rates, atol=table.error)
+
+    # tables are stored in the decoder cache
+    cache = DecoderCache(cache_dir=str(tmpdir))
+    key = ('test', izh.rate_table_range, izh.rate_table_points)
+    cached = cache.get_rate_table(key, izh.rate_table)
+    assert cached is table
+    cached = cache.get_rate_table(key, lambda: None)
+    assert np.all(cached.rates == table.rates)
+    assert cached.error == table.error
+    assert cached.J_min == table.J_min and cached.J_max == table.J_max
+
+
+def test_izhikevich_rate_table_model_cache(RefSimulator, tmpdir, monkeypatch):
+    """The builder stores rate tables in the decoder cache of the model."""
+    def make_net():
+        with nengo.Network(seed=0) as net:
+            nengo.Ensemble(
+                10, 1, neuron_type=nengo.Izhikevich(coupling=0.22))
+        return net
+
+    # the decoder cache is not used if the model has none
+    def fail(*args, **kwargs):
+        raise AssertionError("Decoder cache used")
+    monkeypatch.setattr(DecoderCache, 'get_rate_table', fail)
+    RefSimulator(make_net(), model=Model(decoder_cache=NoDecoderCache()))
+    monkeypatch.undo()
+
+    cache = DecoderCache(cache_dir=str(tmpdir))
+    RefSimulator(make_net(), model=Model(decoder_cache=cache))
+    assert cache.get_size_in_bytes() > 0
+
+    # a new model with the same cache loads the table instead of making it
+    monkeypatch.setattr(nengo.neurons, 'make_rate_table', fail)
+    RefSimulator(make_net(), model=Model(decoder_cache=cache))
+
+
+@pytest.mark.parametrize('neuron_type', [
+    nengo.LIFRate(), nengo.Sigmoid(), nengo.AdaptiveLIFRate()])
+def test_rate_lookup(Simulator, neuron_type, seed):
+    with nengo.Network(seed=seed) as net:
+        u = nengo.Node(lambda t: np.sin(6 * t))
+        a = nengo.Ensemble(50, 1, neuron_type=neuron_type, seed=seed)
+        b = nengo.Ensemble(50, 1, seed=seed,
+                           neuron_type=nengo.RateLookup(neuron_type))
+        probes = []
+        for ens in (a, b):
+            nengo.Connection(u, ens)
+            probes.append((nengo.Probe(ens, synapse=0.01),
+                           nengo.Probe(ens.neurons)))
+        if isinstance(neuron_type, nengo.AdaptiveLIFRate):
+            pa = nengo.Probe(a.neurons, 'adaptation')
+            pb = nengo.Probe(b.neurons, 'adaptation')
+
+    sim = Simulator(net)
+    sim.run(0.5)
+
+    lookup = sim.data[b.neurons]
+    assert lookup.table is not None and lookup.J_max > lookup.J_min
+    (pa_out, pa_rates), (pb_out, pb_rates) = probes
+    assert np.allclose(sim.data[pa_out], sim.data[pb_out], atol=1e-3)
+    # the error is estimated halfway between table points, which can miss
+    # the largest error near a kink (e.g., the LIF threshold)
+    assert np.allclose(sim.data[pa_rates], sim.data[pb_rates],
+                       atol=2 * lookup.table.error + 1e-8)
+    if isinstance(neuron_type, nengo.AdaptiveLIFRate):
+        assert np.allclose(sim.data[pa], sim.data[pb], atol=1e-3)
+
+
+def test_rate_lookup_range(Simulator):
+    lookup = nengo.RateLookup(nengo.LIFRate(), n_points=11, J_min=0, J_max=5)
+    assert np.allclose(lookup.tabulate().table.J, np.linspace(0, 5, 11))
+    with pytest.raises(ValueError):
+        nengo.RateLookup(nengo.LIFRate()).tabulate()
+
+    with nengo.Network() as net:
+        nengo.Ensemble(10, 1, neuron_type=nengo.RateLookup(
+            nengo.LIFRate(tau_rc=Uniform(0.01, 0.03))))
+    with pytest.raises(ValueError):
+        Simulator(net)
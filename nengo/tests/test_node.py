@@ -2,7 +2,9 @@ import numpy as np
 import pytest
 
 import nengo
-from nengo.utils.testing import warns
+from nengo.builder.operator import SimPyFunc
+from nengo.utils.functions import lookahead, pure
+from nengo.utils.testing import Timer, warns
 
 
 def test_time(Simulator):
@@ -330,3 +332,96 @@ def test_args(Simulator, plt):
 
     sim = Simulator(model)
     sim.run(0.01)
+
+
+def test_pure(Simulator):
+    """Pure functions get a read-only view of their input."""
+    inputs = []
+
+    @pure
+    def fn(t, x):
+        inputs.append(x)
+        return 2 * x
+
+    with nengo.Network() as model:
+        u = nengo.Node(lambda t: t)
+        v = nengo.Node(fn, size_in=1)
+        nengo.Connection(u, v, synapse=None)
+        vp = nengo.Probe(v)
+
+    sim = Simulator(model)
+    sim.run(0.01)
+    assert np.allclose(sim.data[vp][:, 0], 2 * sim.trange())
+    # (the first call is made by the Node to determine its size_out)
+    assert all(x is inputs[1] for x in inputs[1:])
+    assert not inputs[1].flags.writeable
+
+    def mutate(t, x):
+        x[...] = 0
+        return x
+
+    with model:
+        w = nengo.Node(pure(mutate), size_in=1)
+        nengo.Connection(u, w, synapse=None)
+
+    sim = Simulator(model)
+    with pytest.raises(ValueError):
+        sim.step()
+
+
+@pytest.mark.slow
+def test_pure_performance(RefSimulator):
+    """Microbenchmark of the Node operators in a model with many Nodes."""
+    def time_nodes(fn, n_steps=1000):
+        with nengo.Network() as model:
+            u = nengo.Node(lambda t: [t] * 1000)
+            for i in range(100):
+                v = nengo.Node(fn, size_in=1000)
+                nengo.Connection(u, v, synapse=None)
+
+        sim = RefSimulator(model)
+        steps = [step for op, step in zip(sim._step_order, sim._steps)
+                 if isinstance(op, SimPyFunc)]
+        with Timer() as timer:
+            for _ in range(n_steps):
+                for step in steps:
+                    step()
+        return timer.duration
+
+    def fn(t, x):
+        return x[0]
+
+    @pure
+    def pure_fn(t, x):
+        return x[0]
+
+    assert time_nodes(pure_fn) < 0.8 * time_nodes(fn)
+
+
+def test_lookahead(Simulator):
+    """Time-only functions declared with lookahead are computed ahead."""
+    calls = []
+
+    @lookahead
+    def fn(t):
+        calls.append(np.size(t))
+        return np.sin(t)[..., None] * [1, -1]
+
+    with nengo.Network() as model:
+        u = nengo.Node(fn)
+        v = nengo.Node(lambda t: np.sin(t) * np.array([1, -1]))
+        up = nengo.Probe(u)
+        vp = nengo.Probe(v)
+
+    del calls[:]
+    sim = Simulator(model)
+    sim.run_steps(100)
+    sim.step()
+    sim.run_steps(50)
+    assert np.array_equal(sim.data[up], sim.data[vp])
+    if Simulator is nengo.Simulator:
+        assert calls == [100, 1, 50]
+
+    sim.reset()
+    sim.run_steps(151)
+    assert np.array_equal(sim.data[up], sim.data[vp])
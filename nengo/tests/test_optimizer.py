@@ -0,0 +1,189 @@
+import numpy as np
+
+import nengo
+from nengo.builder import Model
+from nengo.builder.neurons import SimNeurons
+from nengo.builder.operator import Operator
+from nengo.builder.optimizer import fuse_neurons
+from nengo.builder.signal import Signal
+from nengo.builder.synapses import SimLinearFilters, SimSynapse
+
+
+def n_ops(sim, op_type):
+    model = sim if isinstance(sim, Model) else sim.model
+    return sum(isinstance(op, op_type) for op in model.operators)
+
+
+def n_sim_neurons(sim):
+    return n_ops(sim, SimNeurons)
+
+
+def test_fuse_neurons(RefSimulator, seed):
+    with nengo.Network(seed=seed) as net:
+        u = nengo.Node(lambda t: np.sin(8 * t))
+        neuron_types = [nengo.LIF(), nengo.LIF(), nengo.LIF(tau_rc=0.03),
+                        nengo.LIFRate(), nengo.Izhikevich(), nengo.LIF()]
+        probes = []
+        for neuron_type in neuron_types:
+            ens = nengo.Ensemble(20, 1, neuron_type=neuron_type)
+            nengo.Connection(u, ens)
+            probes.append(nengo.Probe(ens, synapse=0.01))
+            probes.append(nengo.Probe(ens.neurons))
+            if not isinstance(neuron_type, nengo.LIFRate):
+                probes.append(nengo.Probe(ens.neurons, 'voltage'))
+        ens = nengo.Ensemble(20, 1)
+        nengo.Connection(u, ens.neurons, transform=np.ones((20, 1)))
+        probes.append(nengo.Probe(ens.neurons))
+
+    model = Model()
+    model.fuse_neurons = False
+    sim0 = RefSimulator(net, model=model)
+    sim1 = RefSimulator(net)
+    assert n_sim_neurons(sim0) == 7
+    assert n_sim_neurons(sim1) <= 4  # LIFs with different tau_rc are fused
+    sim0.run(0.1)
+    sim1.run(0.1)
+
+    for p in probes:
+        assert np.array_equal(sim0.data[p], sim1.data[p])
+
+    # fused state is still reset
+    sim1.reset()
+    sim1.run(0.1)
+    for p in probes:
+        assert np.array_equal(sim0.data[p], sim1.data[p])
+
+
+def test_fuse_neurons_dependent(RefSimulator, seed):
+    """Neurons that depend on each other within a step are not fused."""
+    with nengo.Network(seed=seed) as net:
+        a = nengo.Ensemble(10, 1)
+        b = nengo.Ensemble(10, 1)
+        c = nengo.Ensemble(10, 1)
+        nengo.Connection(a, b, synapse=None)
+        nengo.Connection(a, c, synapse=None)
+
+    sim = RefSimulator(net)
+    assert n_sim_neurons(sim) == 2
+    sim.run(0.01)
+
+
+class DictCopy(Operator):
+    """Copies a signal held in a dict, where it cannot be replaced."""
+
+    def __init__(self, dst, src):
+        self.signals = {'dst': dst, 'src': src}
+        self.sets = [dst]
+        self.incs = []
+        self.reads = [src]
+        self.updates = []
+
+    def make_step(self, signals, dt, rng):
+        dst = signals[self.signals['dst']]
+        src = signals[self.signals['src']]
+
+        def step():
+            dst[...] = src
+        return step
+
+
+def test_fuse_neurons_hidden(RefSimulator, seed):
+    """Neurons with signals that an operator hides are not fused."""
+    with nengo.Network(seed=seed) as net:
+        u = nengo.Node(lambda t: np.sin(8 * t))
+        ensembles = [nengo.Ensemble(10, 1) for _ in range(3)]
+        for ens in ensembles:
+            nengo.Connection(u, ens)
+
+    model = Model()
+    model.fuse_neurons = False
+    model.build(net)
+    a_out = model.sig[ensembles[0].neurons]['out']
+    copied = Signal(np.zeros(10), name="copied")
+    model.add_op(DictCopy(copied, a_out))
+    fuse_neurons(model)
+    assert n_sim_neurons(model) == 2
+
+    sim = RefSimulator(None, model=model)
+    for _ in range(20):
+        sim.step()
+        assert np.array_equal(sim.signals[copied], sim.signals[a_out])
+
+
+def test_fuse_synapses(RefSimulator, seed):
+    with nengo.Network(seed=seed) as net:
+        u = nengo.Node(lambda t: [np.sin(8 * t), np.cos(5 * t)])
+        synapses = [0.005, 0.005, 0.01, nengo.Alpha(0.005),
+                    nengo.Alpha(0.005), nengo.synapses.Triangle(0.01),
+                    0.0001, 0.0001, nengo.LinearFilter([1, 0], [0.01, 1])]
+        probes = [nengo.Probe(u, synapse=synapse) for synapse in synapses]
+        ens = nengo.Ensemble(20, 2)
+        nengo.Connection(u, ens, synapse=0.005)
+        nengo.Connection(u[0], ens[1], synapse=nengo.Alpha(0.005))
+        probes.append(nengo.Probe(ens, synapse=0.005))
+        probes.append(nengo.Probe(ens.neurons, synapse=0.01))
+
+    model = Model()
+    model.fuse_synapses = False
+    sim0 = RefSimulator(net, model=model)
+    sim1 = RefSimulator(net)
+    assert n_ops(sim0, SimSynapse) == 13
+    assert n_ops(sim1, SimSynapse) == 5  # unshared filters and Triangle
+    assert n_ops(sim1, SimLinearFilters) == 3
+    sim0.run(0.1)
+    sim1.run(0.1)
+    for p in probes:
+        assert np.allclose(sim0.data[p], sim1.data[p], atol=1e-12)
+
+    # fused state is still reset
+    sim1.reset()
+    sim1.run(0.1)
+    for p in probes:
+        assert np.allclose(sim0.data[p], sim1.data[p], atol=1e-12)
+
+
+def test_fuse_synapses_inputs(RefSimulator, seed):
+    with nengo.Network(seed=seed) as net:
+        u = nengo.Node(lambda t: [np.sin(8 * t), np.cos(5 * t)])
+        ensembles = [nengo.Ensemble(20, 2) for _ in range(3)]
+        for ens in ensembles:
+            nengo.Connection(u, ens, synapse=0.005)
+        probes = [nengo.Probe(ens, synapse=0.01) for ens in ensembles]
+        probes.append(nengo.Probe(ensembles[0].neurons, synapse=0.01))
+        v = nengo.Node(lambda t: [np.cos(3 * t)])
+        probes.extend(nengo.Probe(node, synapse=0.02) for node in [u, v, u])
+
+    model = Model()
+    model.fuse_synapses = False
+    sim0 = RefSimulator(net, model=model)
+    sim1 = RefSimulator(net)
+    fused = [op for op in sim1.model.operators
+             if isinstance(op, SimLinearFilters)]
+    assert len(fused) == 3
+
+    # decoded probe inputs are read by nothing else, so they are concatenated
+    # into one base; node outputs are gathered from one or more bases
+    n_bases = sorted(len(set(sig.base for sig in op.inputs)) for op in fused)
+    assert n_bases == [1, 1, 2]
+    u_out = sim1.model.sig[u]['out']
+    assert sum(sig.base is u_out.base
+               for op in fused for sig in op.inputs) == 5
+
+    sim0.run(0.1)
+    sim1.run(0.1)
+    for p in probes:
+        assert np.allclose(sim0.data[p], sim1.data[p], atol=1e-12)
+
+
+def test_linear_filter_state_space():
+    dt = 0.001
+    for synapse in [nengo.Lowpass(0.01), nengo.Alpha(0.005),
+                    nengo.Lowpass(0), nengo.LinearFilter([1, 0], [0.01, 1])]:
+        A, B, C, D = synapse.state_space(dt)
+        x = np.zeros(len(A))
+        u = np.random.RandomState(2).normal(size=100)
+        y = np.zeros(len(u))
+        for i, ui in enumerate(u):
+            y[i] = np.dot(C, x) + D[0, 0] * ui
+            x = np.dot(A, x) + B[:, 0] * ui
+        assert np.allclose(y, nengo.synapses.filt(u, synapse, dt))
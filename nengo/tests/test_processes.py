@@ -6,7 +6,8 @@ import pytest
 import nengo
 import nengo.utils.numpy as npext
 from nengo.dists import Distribution, Gaussian
-from nengo.processes import BrownNoise, WhiteNoise, WhiteSignal
+from nengo.processes import (
+    BrownNoise, FilteredNoise, Piecewise, Process, WhiteNoise, WhiteSignal)
 
 
 class DistributionMock(Distribution):
@@ -30,6 +31,25 @@ def test_whitenoise(rng):
     assert process.run_steps(2, d=3, rng=rng).shape == (2, 3)
 
 
+def test_whitenoise_blocks(seed):
+    """Noise is drawn in blocks, giving the same stream as drawing per step."""
+    dist = DistributionMock(3)
+    step = WhiteNoise(dist, scale=False).make_step(0, 2, 0.001, np.random)
+    for i in range(2500):
+        step(i * 0.001)
+    assert [n for n, _, _ in dist.sample_calls] == [1000, 1000, 1000]
+
+    dt = 1e-3
+    process = WhiteNoise(Gaussian(0, 1))
+    samples = process.run_steps(2500, d=3, dt=dt,
+                                rng=np.random.RandomState(seed))
+    sim_rng = np.random.RandomState(
+        np.random.RandomState(seed).randint(npext.maxint))
+    expected = [sim_rng.normal(0, 1, size=3) / np.sqrt(dt)
+                for _ in range(2500)]
+    assert np.allclose(samples, expected)
+
+
 def test_brownnoise(rng, plt):
     d = 5000
     t = 0.5
@@ -179,6 +199,59 @@ def test_whitesignal_continuity(rng, plt):
     assert abs(np.diff(x, n=2, axis=0)).max() <= safety_factor**2 * a * f**2
 
 
+@pytest.mark.parametrize('high', [None, 20])
+def test_whitesignal_on_demand(high, seed):
+    """Synthesizing on demand gives the same signal as precomputing it."""
+    dt = 0.001
+    x = WhiteSignal(0.3, high, on_demand=False).run(
+        0.7, d=3, dt=dt, rng=np.random.RandomState(seed))
+    y = WhiteSignal(0.3, high, on_demand=True).run(
+        0.7, d=3, dt=dt, rng=np.random.RandomState(seed))
+    assert np.allclose(x, y)
+
+    # only coefficients below the cut-off are kept
+    process = WhiteSignal(0.3, high)
+    coefficients, n_samples = process.coefficients(
+        3, dt, np.random.RandomState(seed))
+    assert n_samples == 300
+    assert coefficients.shape == (3, 151 if high is None else 7)
+
+    # large signals are synthesized on demand by default, but only if the
+    # cut-off leaves few coefficients, since otherwise that is much slower
+    process.max_samples = 100
+    assert process._on_demand(coefficients, n_samples) == (high is not None)
+    z = process.run(0.7, d=3, dt=dt, rng=np.random.RandomState(seed))
+    assert np.allclose(x, z)
+
+
+@pytest.mark.parametrize('process', [
+    WhiteNoise(), WhiteNoise(scale=False), FilteredNoise(), BrownNoise(),
+    FilteredNoise(nengo.Alpha(0.01)), WhiteSignal(0.3, 20),
+    WhiteSignal(0.3, 20, on_demand=True)])
+def test_run_block(process, seed):
+    """Vectorized run_steps gives the same output as stepping the process."""
+    steps = Process.run_block(process, 700, 3, 0.001,
+                              np.random.RandomState(seed))
+    block = process.run_steps(700, d=3, rng=np.random.RandomState(seed))
+    assert np.allclose(steps, block)
+
+
+def test_piecewise(Simulator):
+    process = Piecewise({0.05: [1, 0], 0.1: lambda t: [t, 2 * t]})
+    assert process.default_size_out == 2
+    x = process.run_steps(200, dt=0.001)
+    assert np.allclose(
+        x, [process.function(t) for t in process.ntrange(200) - 0.001])
+
+    with nengo.Network() as model:
+        u = nengo.Node(process)
+        up = nengo.Probe(u)
+    sim = Simulator(model)
+    sim.run(0.2)
+    assert np.allclose(
+        sim.data[up], [process.function(t) for t in sim.trange()])
+
+
 def test_sampling_shape():
     process = WhiteSignal(0.1)
     assert process.run_steps(1).shape == (1, 1)
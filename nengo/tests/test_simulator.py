@@ -5,6 +5,7 @@ import nengo.simulator
 from nengo.builder import Model
 from nengo.builder.operator import Copy, Reset, DotInc
 from nengo.builder.signal import Signal
+from nengo.utils.realtime import RealTime
 
 
 def test_steps(RefSimulator):
@@ -83,3 +84,32 @@ def test_probedict():
     probedict = nengo.simulator.ProbeDict(raw)
     assert np.all(probedict["scalar"] == np.asarray(raw["scalar"]))
     assert np.all(probedict.get("list") == np.asarray(raw.get("list")))
+
+
+def test_realtime(RefSimulator):
+    with nengo.Network(seed=0) as model:
+        u = nengo.Node(lambda t: np.sin(8 * t))
+        ens = nengo.Ensemble(10, 1)
+        nengo.Connection(u, ens)
+        p = nengo.Probe(ens, synapse=0.01)
+
+    sim0 = RefSimulator(model)
+    sim0.run(0.1)
+    sim1 = RefSimulator(model)
+
+    # a fake clock that only advances when sleeping
+    now = [0.]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    realtime = RealTime(clock=lambda: now[0], sleep=sleep)
+    sim1.run(0.1, realtime=realtime)
+    assert sim1.realtime is realtime
+    assert np.allclose(now[0], 0.099)  # the last step is due after 99 steps
+    assert np.array_equal(sim0.data[p], sim1.data[p])
+
+    assert sim1.realtime.n_steps == 100
+    assert sim1.realtime.histogram()[0].sum() == 100
+    sim1.run(0.05, realtime=True)
+    assert sim1.realtime.n_steps == 50  # a new instance for each run
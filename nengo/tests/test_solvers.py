@@ -5,19 +5,23 @@ TODO:
 """
 from __future__ import print_function
 
+import threading
+
 import numpy as np
 import pytest
 
 import nengo
+from nengo.cache import DecoderCache
 from nengo.dists import UniformHypersphere
 from nengo.utils.compat import range
 from nengo.utils.numpy import rms, norm
 from nengo.utils.testing import allclose, Timer
 from nengo.solvers import (
-    cholesky, conjgrad, block_conjgrad, conjgrad_scipy, lsmr_scipy,
-    Lstsq, LstsqNoise, LstsqL2, LstsqL2nz,
-    LstsqL1, LstsqDrop,
-    Nnls, NnlsL2, NnlsL2nz)
+    cholesky, CholeskyCache, conjgrad, block_conjgrad, conjgrad_scipy,
+    lsmr_scipy,
+    randomized_svd, Lstsq, LstsqNoise, LstsqL2, LstsqL2nz,
+    LstsqL1, LstsqDrop, LstsqRandomizedSVD,
+    Nnls, NnlsL2, NnlsL2nz, _gram_factor)
 
 
 def get_encoders(n_neurons, dims, rng=None):
@@ -57,6 +61,79 @@ def test_cholesky(rng):
     assert np.allclose(x0, x2)
 
 
+def test_cholesky_cache(rng):
+    A, b = get_system(500, 100, 2, rng=rng)
+    sigma = 0.1 * A.max()
+    x0, _ = cholesky(A, b, sigma)
+    x1, _ = cholesky(A, b**2, sigma)
+
+    cache = CholeskyCache()
+    with cache:
+        y0, _ = cholesky(A, b, sigma)
+        y1, _ = cholesky(A, b**2, sigma)
+        assert len(cache) == 1
+        cholesky(A, b, 2 * sigma)
+        assert len(cache) == 2
+    assert CholeskyCache.active() is None
+    assert np.allclose(x0, y0)
+    assert np.allclose(x1, y1)
+
+    # only the most recent factorization is kept if they don't fit
+    with CholeskyCache(max_bytes=0) as cache:
+        cholesky(A, b, sigma)
+        cholesky(A, b, 2 * sigma)
+        assert len(cache) == 1
+
+
+def test_cholesky_cache_threads():
+    """Each thread only sees the caches it entered."""
+    entered = [threading.Event(), threading.Event()]
+    done = threading.Event()
+    caches = [CholeskyCache(), CholeskyCache()]
+    active = [None, None]
+
+    def build(i):
+        with caches[i]:
+            entered[i].set()
+            entered[1 - i].wait(1.)
+            active[i] = CholeskyCache.active()
+            if i == 0:
+                done.wait(1.)
+            else:
+                done.set()
+
+    threads = [threading.Thread(target=build, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(2.)
+    assert active[0] is caches[0]
+    assert active[1] is caches[1]
+    assert CholeskyCache.active() is None
+
+
+def test_cholesky_cache_build(RefSimulator, monkeypatch, seed):
+    """Connections from the same ensemble share one factorization."""
+    calls = []
+
+    def gram_factor(*args):
+        calls.append(args)
+        return _gram_factor(*args)
+    monkeypatch.setattr(nengo.solvers, '_gram_factor', gram_factor)
+
+    with nengo.Network(seed=seed) as model:
+        a = nengo.Ensemble(50, 2)
+        b = nengo.Node(size_in=2)
+        nengo.Connection(a, b)
+        nengo.Connection(a, b, function=lambda x: x**2)
+        nengo.Connection(a, b[0], function=lambda x: x[0] * x[1])
+        nengo.Probe(a)
+
+    sim = RefSimulator(model)
+    assert len(calls) == 1
+    assert len(sim.model.cholesky_cache) == 0
+
+
 def test_conjgrad(rng):
     A, b = get_system(1000, 100, 2, rng=rng)
     sigma = 0.1 * A.max()
@@ -69,7 +146,7 @@ def test_conjgrad(rng):
 
 
 @pytest.mark.parametrize('Solver', [
-    Lstsq, LstsqNoise, LstsqL2, LstsqL2nz, LstsqDrop])
+    Lstsq, LstsqNoise, LstsqL2, LstsqL2nz, LstsqDrop, LstsqRandomizedSVD])
 def test_decoder_solver(Solver, plt, rng):
     dims = 1
     n_neurons = 100
@@ -153,6 +230,32 @@ def test_weight_solver(Solver, rng):
     assert np.allclose(W1, W2)
 
 
+def test_randomized_svd(rng):
+    A, b = get_system(1000, 200, 2, rng=rng)
+    sigma = 0.1 * A.max()
+
+    x0, _ = cholesky(A, b, sigma)
+    x1, info1 = randomized_svd(A, b, sigma, rng=rng, rank=200)
+    x2, info2 = randomized_svd(A, b, sigma, rng=rng)
+    x3, info3 = randomized_svd(A, b, sigma, rng=rng, rank=10)
+    assert info1['rank'] == 200 and info3['rank'] == 10
+    assert 10 < info2['rank'] < 200
+    assert np.allclose(x0, x1)
+    assert rms(x2 - x0) / rms(x0) < 0.02
+    assert np.all(info3['rmses'] > info2['rmses'])
+
+
+def test_randomized_svd_small(RefSimulator, seed):
+    """A tight tolerance can require sketching the whole range."""
+    with nengo.Network(seed=seed) as net:
+        a = nengo.Ensemble(55, 1)
+        b = nengo.Ensemble(10, 1)
+        conn = nengo.Connection(a, b, solver=LstsqRandomizedSVD(tol=1e-8))
+
+    sim = RefSimulator(net)
+    assert sim.data[conn].solver_info['rank'] <= 55
+
+
 def test_scipy_solvers(rng):
     pytest.importorskip('scipy', minversion='0.11')  # version for lsmr
 
@@ -189,6 +292,67 @@ def test_nnls(Solver, plt, rng):
     assert rel_rmse < 0.02
 
 
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+@pytest.mark.parametrize('Solver', [Nnls, NnlsL2, LstsqL1])
+def test_parallel_columns(Solver, backend, rng):
+    if Solver is LstsqL1:
+        pytest.importorskip('sklearn')
+    else:
+        pytest.importorskip('scipy')
+
+    A, _ = get_system(300, 50, 1, rng=rng)
+    E = rng.normal(size=(1, 7))
+    Y = rng.uniform(-1, 1, size=(300, 1))
+
+    X0, info0 = Solver(weights=True)(A, Y, rng=rng, E=E)
+    X1, info1 = Solver(weights=True, n_jobs=3, backend=backend)(
+        A, Y, rng=rng, E=E)
+    assert X1.shape == (50, 7)
+    assert np.array_equal(X0, X1)
+    assert sorted(info0) == sorted(info1)
+    for key in info0:
+        assert np.array_equal(info0[key], info1[key])
+
+    # the pool is kept for later solves
+    n_pools = len(nengo.solvers._pools)
+    X2, _ = Solver(weights=True, n_jobs=3, backend=backend)(
+        A, Y, rng=rng, E=E)
+    assert len(nengo.solvers._pools) == n_pools
+    assert np.array_equal(X0, X2)
+
+
+@pytest.mark.parametrize('Solver', [Nnls, LstsqL1])
+def test_parallel_columns_cache(Solver, tmpdir, rng):
+    """Parallel settings change neither the hash nor the cache key."""
+    pytest.importorskip('sklearn' if Solver is LstsqL1 else 'scipy')
+    solver0 = Solver(weights=True)
+    solver1 = Solver(weights=True, n_jobs=2, backend='process')
+    assert hash(solver0) == hash(solver1)
+
+    A, _ = get_system(100, 20, 1, rng=rng)
+    Y = rng.uniform(-1, 1, size=100)
+    cache = DecoderCache(cache_dir=str(tmpdir))
+    key0 = cache._get_cache_key(solver0, A, Y, np.random.RandomState(1), None)
+    key1 = cache._get_cache_key(solver1, A, Y, np.random.RandomState(1), None)
+    assert key0 == key1
+    assert solver1.n_jobs == 2
+
+
+def test_lstsql1_rmses(rng):
+    """One-dimensional targets give decoders and RMSE of one dimension less."""
+    pytest.importorskip('sklearn')
+    A, _ = get_system(100, 20, 1, rng=rng)
+    Y = rng.uniform(-1, 1, size=100)
+    X, info = LstsqL1(n_jobs=2)(A, Y)
+    assert X.shape == (20,)
+    assert np.ndim(info['rmses']) == 0
+
+
+def test_parallel_columns_backend():
+    with pytest.raises(ValueError):
+        Nnls(backend='gpu')
+
+
 @pytest.mark.slow
 def test_subsolvers_L2(rng, logger):
     pytest.importorskip('scipy', minversion='0.11')  # version for lsmr
@@ -217,6 +381,25 @@ def test_subsolvers_L2(rng, logger):
             "Solver %s" % solver.__name__)
 
 
+@pytest.mark.slow
+def test_randomized_svd_large(rng, logger):
+    A, B = get_system(m=5000, n=5000, d=3, rng=rng)
+
+    with Timer() as t0:
+        _, info0 = LstsqL2()(A, B, rng=rng)
+    with Timer() as t:
+        _, info = LstsqRandomizedSVD()(A, B, rng=rng)
+    logger.info('LstsqL2 duration: %0.3f', t0.duration)
+    logger.info('LstsqRandomizedSVD duration: %0.3f', t.duration)
+    logger.info('duration relative to LstsqL2: %0.2f',
+                t.duration / t0.duration)
+    logger.info('rank: %d', info['rank'])
+    logger.info('RMSE relative to LstsqL2: %s',
+                info['rmses'] / info0['rmses'])
+
+    assert np.all(info['rmses'] < 1.1 * info0['rmses'])
+
+
 @pytest.mark.noassertions
 def test_subsolvers_L1(rng, logger):
     pytest.importorskip('sklearn')
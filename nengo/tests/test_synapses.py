@@ -1,3 +1,5 @@
+import collections
+
 import numpy as np
 import pytest
 
@@ -68,6 +70,31 @@ def test_triangle(Simulator, plt, seed):
     assert allclose(t, y, ysim, delay=dt, rtol=0, plt=plt)
 
 
+@pytest.mark.parametrize("t, shape", [
+    (0.0004, (3,)), (0.001, (3,)), (0.03, (3,)), (0.01, (2, 3))])
+def test_triangle_history(t, shape, rng):
+    """The Triangle step matches subtracting its history from a list of the
+    scaled signals one by one, up to rounding in the running sum."""
+    dt = 1e-3
+    u = rng.normal(size=(1000,) + shape)
+    n_taps = int(np.round(t / dt)) + 1
+    num = np.arange(n_taps, 0, -1, dtype=float)
+    num /= num.sum()
+
+    expected = np.zeros(shape)
+    history = collections.deque(maxlen=n_taps)
+    output = np.zeros(shape)
+    step = Triangle(t).make_step(dt, output)
+    for ui in u:
+        expected[...] += num[0] * ui
+        for xk in history:
+            expected -= xk
+        history.appendleft(num[-1] * ui)
+
+        step(ui)
+        assert np.allclose(output, expected, rtol=0, atol=1e-12)
+
+
 def test_decoders(Simulator, plt, seed):
     dt = 1e-3
     tau = 0.01
@@ -155,6 +182,67 @@ def test_lti_lowpass(rng, plt):
     assert np.allclose(x, y)
 
 
+@pytest.mark.parametrize("synapse", [Alpha(0.005), LinearFilter(
+    [1, 0], [1e-4, 0.02, 1]), LinearFilter([0.01, 1], [1e-4, 0.02, 1])])
+def test_state_space_step(synapse, rng):
+    """The state-space step matches the filter's difference equation."""
+    dt = 1e-3
+    u = rng.normal(size=(200, 3, 2))
+    num, den = synapse.discretize(dt)
+
+    x = np.zeros_like(u)
+    for i in range(len(u)):
+        x[i] = sum(num[k] * u[i - k] for k in range(len(num)) if i >= k)
+        x[i] -= sum(den[k] * x[i - k - 1] for k in range(len(den)) if i > k)
+
+    # output that is contiguous, and one that is a strided view
+    for output in [np.zeros((3, 2)), np.zeros((2, 3)).T]:
+        step = synapse.make_step(dt, output)
+        y = np.zeros_like(u)
+        for i in range(len(u)):
+            step(u[i])
+            y[i] = output
+        assert np.allclose(x, y)
+
+
+@pytest.mark.parametrize("synapse", [
+    Lowpass(0.01), Alpha(0.005), LinearFilter([1, 0], [1e-4, 0.02, 1])])
+def test_filt_numpy(synapse, rng):
+    """The NumPy filtering fallback matches stepping the synapse."""
+    dt = 1e-3
+    u = rng.normal(size=(300, 4))
+    b, a = nengo.synapses._lfilter_coefficients(synapse, dt)
+    lfilter = nengo.synapses._lfilter_numpy(b, a, block_size=32)
+
+    # filter in two uneven parts, carrying the state across
+    z = np.zeros((len(a) - 1, 4))
+    y0, z = lfilter(u[:150], z)
+    y1, z = lfilter(u[150:], z)
+
+    output = np.zeros(4)
+    step = synapse.make_step(dt, output)
+    for i, ui in enumerate(u):
+        step(ui)
+        assert np.allclose(output, y0[i] if i < 150 else y1[i - 150])
+
+
+def test_filt_chunks(tmpdir, rng):
+    """Memory-mapped data can be filtered in place, in chunks."""
+    dt = 1e-3
+    u = rng.normal(size=(500, 3))
+    y = filt(u, Alpha(0.01), dt=dt, axis=0)
+
+    chunked = np.array(u)
+    nengo.synapses._filt_linear([chunked], Alpha(0.01), dt, chunk_size=20)
+    assert np.allclose(y, chunked)
+
+    data = np.memmap(str(tmpdir.join("data.dat")), dtype=np.float64,
+                     mode='w+', shape=(3, 500))
+    data[:] = u.T
+    filt(data, Alpha(0.01), dt=dt, axis=1, copy=False)
+    assert np.allclose(y, data.T)
+
+
 def test_synapseparam():
     """SynapseParam must be a Synapse, and converts numbers to LowPass."""
     class Test(object):
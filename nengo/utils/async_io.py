@@ -0,0 +1,261 @@
+"""Exchanging data with external processes without blocking the simulation.
+"""
+
+from __future__ import absolute_import, division
+
+import collections
+import socket
+import threading
+
+import numpy as np
+
+from .compat import monotonic
+
+
+class AsyncIO(object):
+    """A Node output that exchanges data with the outside in the background.
+
+    Calling an external source or sink directly from a Node blocks the
+    simulation until the exchange is complete. Instead, an ``AsyncIO``
+    receives inputs and sends outputs on background threads. Each time step,
+    the Node returns the latest input that has been received, without
+    waiting, and queues its own input to be sent::
+
+        io = AsyncIO.from_socket(sock, size_in=2, size_out=3)
+        node = nengo.Node(io, size_in=io.size_in, size_out=io.size_out)
+        ...
+        with nengo.Simulator(model) as sim:
+            sim.run(1.)
+        io.close()
+        print(io.stats())
+
+    ``size_out`` must be given to the Node, since otherwise the Node calls
+    its output to determine it, which starts the exchange. The threads are
+    started on the first call, or by calling `start`.
+
+    Received inputs are double-buffered: the receiving thread writes into a
+    back buffer and swaps it with the front buffer, which the simulator reads.
+    Inputs that are replaced before the simulator reads them are counted as
+    missed. Outputs that do not fit in the queue because the sink is too slow
+    replace the oldest queued output, which is counted as dropped.
+
+    Ages and latencies are measured with a monotonic clock. On Python 2, this
+    requires the ``monotonic`` package; without it, wall-clock time is used,
+    so setting the system clock disturbs them and ``max_age``.
+
+    Parameters
+    ----------
+    size_in : int
+        The number of dimensions sent each time step.
+    size_out : int
+        The number of dimensions received.
+    receive : callable, optional
+        Called repeatedly with no arguments on the receiving thread. It
+        returns the next input, an array of size ``size_out``, or None if no
+        input is available yet. It should not block for longer than a short
+        timeout, so that the thread can be stopped. It raises ``EOFError``
+        when the source is exhausted. Required if ``size_out > 0``.
+    send : callable, optional
+        Called on the sending thread with each output, an array of size
+        ``size_in``. Required if ``size_in > 0``.
+    max_queue : int, optional
+        The maximum number of outputs waiting to be sent. Default: 1, so that
+        only the most recent output is sent when the sink is slow.
+    max_age : float, optional
+        Inputs received more than ``max_age`` seconds ago are stale, and
+        zeros are returned instead of them. By default, the latest input is
+        returned however old it is.
+    history : int, optional
+        The number of input ages and output latencies kept for `stats`.
+    """
+
+    def __init__(self, size_in, size_out, receive=None, send=None,
+                 max_queue=1, max_age=None, history=10000):
+        if size_out > 0 and receive is None:
+            raise ValueError("'receive' must be given if size_out > 0")
+        if size_in > 0 and send is None:
+            raise ValueError("'send' must be given if size_in > 0")
+        if max_queue < 1:
+            raise ValueError("'max_queue' must be at least 1")
+        self.size_in = size_in
+        self.size_out = size_out
+        self.receive = receive
+        self.send = send
+        self.max_queue = max_queue
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._queued = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads = []
+
+        # the receiving thread owns the back buffer, the simulator the output
+        self._front = np.zeros(size_out)
+        self._back = np.zeros(size_out)
+        self._front_time = None
+        self._unread = False
+        self._output = np.zeros(size_out)
+        self._queue = collections.deque()
+
+        self.n_received = 0
+        self.n_read = 0
+        self.n_missed = 0
+        self.n_stale = 0
+        self.n_sent = 0
+        self.n_dropped = 0
+        self.input_ages = collections.deque(maxlen=history)
+        self.output_latencies = collections.deque(maxlen=history)
+        self.error = None
+
+    @classmethod
+    def from_socket(cls, sock, size_in, size_out, timeout=0.05, **kwargs):
+        """Exchange data over a connected stream socket.
+
+        Each input and output is sent as a message of ``float64`` values in
+        little-endian byte order, of size ``size_out`` and ``size_in``
+        respectively. ``timeout`` is the time in seconds the receiving thread
+        waits for data before checking if it should stop. Other arguments are
+        passed to `AsyncIO`.
+        """
+        sock.settimeout(timeout)
+        n_bytes = 8 * size_out
+        data = bytearray()
+
+        def receive():
+            try:
+                chunk = sock.recv(n_bytes - len(data))
+            except socket.timeout:
+                return None
+            if len(chunk) == 0:
+                raise EOFError("Socket was closed")
+            data.extend(chunk)
+            if len(data) < n_bytes:
+                return None
+            x = np.frombuffer(bytes(data), dtype='<f8')
+            del data[:]
+            return x
+
+        def send(x):
+            sock.sendall(np.asarray(x, dtype='<f8').tobytes())
+
+        return cls(size_in, size_out,
+                   receive=receive if size_out > 0 else None,
+                   send=send if size_in > 0 else None, **kwargs)
+
+    def __call__(self, t, x=None):
+        if len(self._threads) == 0:
+            self.start()
+        if self.size_in > 0:
+            self._put(x)
+        if self.size_out > 0:
+            self._get()
+        return self._output
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, dummy_exc_type, dummy_exc_value, dummy_traceback):
+        self.close()
+
+    def _get(self):
+        with self._lock:
+            if self._front_time is None:
+                return  # nothing received yet; output stays zero
+            self._output[...] = self._front
+            age = monotonic() - self._front_time
+            self.n_read += self._unread
+            self._unread = False
+        self.input_ages.append(age)
+        if self.max_age is not None and age > self.max_age:
+            self.n_stale += 1
+            self._output[...] = 0
+
+    def _put(self, x):
+        with self._lock:
+            if len(self._queue) == self.max_queue:
+                self._queue.popleft()
+                self.n_dropped += 1
+            self._queue.append((np.array(x), monotonic()))
+            self._queued.notify()
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            value = self.receive()
+            if value is None:
+                continue
+            self._back[...] = value
+            with self._lock:
+                self._front, self._back = self._back, self._front
+                self._front_time = monotonic()
+                self.n_received += 1
+                self.n_missed += self._unread
+                self._unread = True
+
+    def _send_loop(self):
+        while True:
+            with self._lock:
+                while len(self._queue) == 0 and not self._stop.is_set():
+                    self._queued.wait()
+                if len(self._queue) == 0:
+                    return
+                x, t_queued = self._queue.popleft()
+            self.send(x)
+            self.output_latencies.append(monotonic() - t_queued)
+            self.n_sent += 1
+
+    def _run(self, loop):
+        try:
+            loop()
+        except EOFError:
+            pass
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        """Start the receiving and sending threads."""
+        if len(self._threads) > 0:
+            return
+        self._stop.clear()
+        loops = ([self._receive_loop] if self.size_out > 0 else []) + (
+            [self._send_loop] if self.size_in > 0 else [])
+        for loop in loops:
+            thread = threading.Thread(target=self._run, args=(loop,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, timeout=1.):
+        """Stop the threads, after sending the outputs still queued.
+
+        Raises the error of a thread that failed, other than ``EOFError``.
+        """
+        self._stop.set()
+        with self._lock:
+            self._queued.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def stats(self):
+        """Counts of exchanged data and summaries of input ages and latencies.
+
+        Ages are the times in seconds between receiving inputs and the
+        simulator reading them, and latencies the times between the simulator
+        queuing outputs and them being sent.
+        """
+        def summary(times):
+            times = np.array(times)
+            return dict(
+                mean=times.mean() if times.size > 0 else np.nan,
+                max=times.max() if times.size > 0 else np.nan)
+
+        return dict(
+            n_received=self.n_received, n_read=self.n_read,
+            n_missed=self.n_missed, n_stale=self.n_stale,
+            n_sent=self.n_sent, n_dropped=self.n_dropped,
+            input_age=summary(self.input_ages),
+            output_latency=summary(self.output_latencies))
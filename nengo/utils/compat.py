@@ -17,6 +17,25 @@ except ImportError:
 assert Counter
 assert OrderedDict
 
+# A clock that cannot go backwards was introduced in Python 3.3. On Python 2,
+# the ``monotonic`` package provides one; without it, we fall back to
+# ``time.time``, which is wall-clock time and jumps when the clock is set.
+try:
+    from time import monotonic
+except ImportError:
+    try:
+        from monotonic import monotonic
+    except ImportError:
+        from time import time as monotonic
+assert monotonic
+
+# getargspec is deprecated in Python 3, where getfullargspec replaces it
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    from inspect import getargspec
+assert getargspec
+
 # If something's changed from Python 2 to 3, we handle that here
 if PY2:
     import cPickle as pickle
@@ -94,7 +94,8 @@ def response_curves(ens, sim, inputs=None):
         inputs = np.linspace(-1.0, 1.0)
 
     x = np.atleast_2d(inputs).T
-    activities = ens.neuron_type.rates(
+    neuron_type = sim.model.params.get(ens.neurons, ens.neuron_type)
+    activities = neuron_type.rates(
         x, sim.data[ens].gain, sim.data[ens].bias)
     activities = np.squeeze(activities)
 
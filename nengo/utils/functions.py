@@ -1,8 +1,60 @@
 from __future__ import absolute_import
 
+import bisect
+
 import numpy as np
 
-from nengo.utils.compat import is_number, OrderedDict, iteritems
+from nengo.utils.compat import is_number, iteritems
+
+
+def pure(fn):
+    """Declare that ``fn`` does not modify its input and never returns None.
+
+    Node outputs and connection functions declared pure are called with a
+    read-only view of their input instead of a copy of it, and their return
+    values are not checked, which makes them cheaper to call every step::
+
+        @pure
+        def square(t, x):
+            return x ** 2
+
+        node = nengo.Node(square, size_in=2)
+
+    Functions that do modify their input will raise an error when called.
+    """
+    fn.pure = True
+    return fn
+
+
+def is_pure(fn):
+    """Whether ``fn`` has been declared pure with `pure`."""
+    return getattr(fn, 'pure', False) is True
+
+
+def lookahead(fn):
+    """Declare that ``fn`` is a function of time only that accepts arrays.
+
+    Nodes with no input whose output function is declared this way are
+    evaluated ahead of time: when the simulator runs a number of steps, the
+    function is called once with an array of the times of all those steps,
+    and must return an array with the output for each time on a row::
+
+        @lookahead
+        def stimulus(t):
+            return np.sin(t)[..., None] * [1, -1]
+
+        node = nengo.Node(stimulus)
+
+    The function must still accept scalar times, and must not have side
+    effects that depend on when it is called.
+    """
+    fn.lookahead = True
+    return fn
+
+
+def is_lookahead(fn):
+    """Whether ``fn`` has been declared with `lookahead`."""
+    return getattr(fn, 'lookahead', False) is True
 
 
 def piecewise(data):
@@ -42,7 +94,11 @@ def piecewise(data):
     -------
     function:
         A function that takes a variable t and returns the corresponding
-        value from the dictionary.
+        value from the dictionary. The value is found by binary search, so
+        schedules with many times are cheap to evaluate. If t is an array,
+        the function returns an array with the value for each time on a row.
+        See also `nengo.processes.Piecewise`, which can compute the values
+        for a whole run at once.
 
     Examples
     --------
@@ -70,20 +126,50 @@ def piecewise(data):
 
     """
 
-    # first, sort the data (to simplify finding the right element
-    # when calling the function)
+    times, values = _piecewise_data(data)
+    output_length = values[0].size
+
+    # constant values stacked, for vectorized lookups
+    constants = np.array([np.zeros(output_length) if callable(v) else v
+                          for v in values])
+    is_callable = np.array([callable(v) for v in values])
+
+    def piecewise_function(t):
+        if np.ndim(t) > 0:
+            return _piecewise_array(np.asarray(t), times, values,
+                                    constants, is_callable)
+
+        # find the last time that is <= t
+        value = values[bisect.bisect_right(times, t) - 1]
+
+        # if it's a function, call it
+        if callable(value):
+            return np.asarray(value(t))
+        return value
+
+    # without functions of time, the values can be looked up ahead of time
+    return (piecewise_function if is_callable.any() else
+            lookahead(piecewise_function))
+
+
+def _piecewise_data(data):
+    """Sorted times and values of a piecewise function, starting with zero.
+
+    The ``data`` dictionary is validated, but not modified.
+    """
     output_length = None  # the dimensionality of the returned values
-    for time in data:
+    items = []
+    for time, value in iteritems(data):
         if not is_number(time):
             raise TypeError('Keys must be times (floats or ints), not "%s"'
                             % repr(time.__class__))
 
         # figure out the length of this item
-        if callable(data[time]):
-            length = np.asarray(data[time](0.0)).size
+        if callable(value):
+            length = np.asarray(value(0.0)).size
         else:
-            data[time] = np.asarray(data[time])
-            length = data[time].size
+            value = np.asarray(value)
+            length = value.size
 
         # make sure this is the same length as previous items
         if length != output_length and output_length is not None:
@@ -91,19 +177,19 @@ def piecewise(data):
                              'time %4g has %d items instead of %d' %
                              (time, length, output_length))
         output_length = length
+        items.append((time, value))
 
     # make a default output of 0 when t before what was passed
-    data[np.finfo(float).min] = np.zeros(output_length)
-    ordered_data = OrderedDict(sorted(iteritems(data)))
-
-    # build the function to return
-    def piecewise_function(t, data=ordered_data):
-        # get the t we'll use for output
-        for time in (time for time in data if time <= t):
-            out_t = time
-
-        # if it's a function, call it
-        if callable(data[out_t]):
-            return np.asarray(data[out_t](t))
-        return data[out_t]
-    return piecewise_function
+    items.append((np.finfo(float).min, np.zeros(output_length)))
+    items.sort(key=lambda item: item[0])
+    return [time for time, _ in items], [v for _, v in items]
+
+
+def _piecewise_array(t, times, values, constants, is_callable):
+    """Evaluate a piecewise function at each time in the array ``t``."""
+    index = np.searchsorted(times, t, side='right') - 1
+    out = constants[index]
+    for i in np.unique(index[is_callable[index]]):
+        mask = index == i
+        out[mask] = [np.ravel(values[i](ti)) for ti in t[mask]]
+    return out
@@ -134,7 +134,8 @@ def rates_kernel(t, spikes, kind='gauss', tau=0.04):
 
 
 def settled_firingrate(step_math, J, states,
-                       dt=0.001, settle_time=0.1, sim_time=1.0):
+                       dt=0.001, settle_time=0.1, sim_time=1.0,
+                       tol=None, chunk_size=None, n_threads=1):
     """Compute firing rates (in Hz) for given vector input, ``x``.
 
     Unlike the default naive implementation, this approach takes into
@@ -143,6 +144,17 @@ def settled_firingrate(step_math, J, states,
     initial transients settle. Then, we run the neurons for a second
     and find the average (which should approximate the firing rate).
 
+    With ``tol``, each neuron stops being simulated as soon as its rate is
+    known: when its inter-spike interval has stabilized for long enough that
+    the rate is known to within about ``tol`` Hz, or when it has come to rest
+    (its state no longer changes and it does not spike). This assumes that
+    ``step_math`` is a spiking step function, which outputs ``1 / dt`` for
+    each spike.
+
+    With ``tol`` or ``chunk_size``, neurons are simulated in flattened
+    subsets of ``J``, so ``step_math`` must treat all neurons the same
+    (i.e., have no per-neuron parameters).
+
     Parameters
     ---------
     step_math : function
@@ -151,17 +163,198 @@ def settled_firingrate(step_math, J, states,
         a vector of currents to generate firing rates from
     *states : list of ndarrays
         additional state needed by the step function
+    tol : float, optional
+        Stop simulating neurons whose rate is known to within about ``tol``
+        Hz. By default, all neurons are simulated for the full ``sim_time``.
+    chunk_size : int, optional
+        Simulate at most this many neurons at a time, to bound memory use.
+    n_threads : int, optional
+        Simulate chunks on this many threads (default: 1).
     """
+    settle_steps = int(settle_time / dt)
+    sim_steps = int(sim_time / dt)
+    if tol is None and chunk_size is None:
+        return _settled_firingrate(
+            step_math, J, states, dt, settle_steps, sim_steps, tol)
+
+    J = np.asarray(J)
+    flat_J = J.ravel()
+    flat_states = [np.array(state, dtype=np.float64).ravel()
+                   for state in states]
+    rates = np.zeros(J.shape)
+    chunks = np.array_split(np.arange(J.size), max(
+        1, -(-J.size // chunk_size) if chunk_size else 1))
+
+    def simulate(chunk):
+        rates.flat[chunk] = _settled_firingrate(
+            step_math, flat_J[chunk], [s[chunk] for s in flat_states],
+            dt, settle_steps, sim_steps, tol)
+
+    if n_threads > 1 and len(chunks) > 1:
+        import multiprocessing.pool
+        pool = multiprocessing.pool.ThreadPool(min(n_threads, len(chunks)))
+        try:
+            pool.map(simulate, chunks)
+        finally:
+            pool.terminate()
+    else:
+        for chunk in chunks:
+            simulate(chunk)
+    return rates
+
+
+def _settled_firingrate(step_math, J, states, dt, settle_steps, sim_steps,
+                        tol, first_check=10, n_intervals=3, rest_tol=1e-9):
     out = np.zeros_like(J)
     total = np.zeros_like(J)
 
     # Simulate for the settle time
-    steps = int(settle_time / dt)
-    for _ in range(steps):
+    for _ in range(settle_steps):
         step_math(dt, J, out, *states)
-    # Simulate for sim time, and keep track
-    steps = int(sim_time / dt)
-    for _ in range(steps):
+
+    if tol is None:
+        # Simulate for sim time, and keep track
+        for _ in range(sim_steps):
+            step_math(dt, J, out, *states)
+            total += out
+        return total / float(sim_steps)
+
+    rates = np.zeros_like(J)
+    active = np.arange(J.size)  # neurons still being simulated
+    count = np.zeros_like(J)  # number of spikes
+    last = np.zeros_like(J)  # time of the last spike
+    snapshots = []  # count, last and states at the last checks
+    check = first_check
+
+    for step in range(1, sim_steps + 1):
         step_math(dt, J, out, *states)
         total += out
-    return total / float(steps)
+        spiked = out > 0
+        count += spiked
+        last[spiked] = step * dt
+        if step != check or step == sim_steps:
+            continue
+
+        check *= 2
+        if len(snapshots) == n_intervals:
+            stable, rate = _settled(snapshots, count, last, dt, tol)
+            rest = ~stable & (count == snapshots[-1][0]) & np.all(
+                [np.abs(s - s1) <= rest_tol * step / 2.
+                 for s, s1 in zip(states, snapshots[-1][2])], axis=0)
+
+            # Settled neurons are assumed to keep their rate until the end
+            remaining = (sim_steps - step) / float(sim_steps)
+            rates[active[stable]] = (
+                total[stable] / float(sim_steps) + remaining * rate[stable])
+            rates[active[rest]] = total[rest] / float(sim_steps)
+
+            keep = ~(stable | rest)
+            if not np.all(keep):
+                active, J, out, total, count, last = [x[keep] for x in (
+                    active, J, out, total, count, last)]
+                states = [state[keep] for state in states]
+                snapshots = [(c[keep], t[keep], [s[keep] for s in ss])
+                             for c, t, ss in snapshots]
+                if active.size == 0:
+                    return rates
+            del snapshots[0]
+
+        snapshots.append((count.copy(), last.copy(),
+                          [state.copy() for state in states]))
+
+    rates[active] = total / float(sim_steps)
+    return rates
+
+
+def _settled(snapshots, count, last, dt, tol):
+    """Find neurons that spike periodically across several intervals.
+
+    The intervals are between the last spikes at consecutive checks. Spike
+    times are only known to within a step, so the mean ISIs over consecutive
+    intervals must agree to within that. Returns which neurons settled and
+    their rates.
+    """
+    counts = [c for c, _, _ in snapshots] + [count]
+    times = [t for _, t, _ in snapshots] + [last]
+    n = [c1 - c0 for c0, c1 in zip(counts[:-1], counts[1:])]
+    spans = [t1 - t0 for t0, t1 in zip(times[:-1], times[1:])]
+    total_n, total_span = counts[-1] - counts[0], times[-1] - times[0]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = total_n / total_span
+        settled = (counts[0] > 0) & (rate * dt <= tol * total_span)
+        for n_a, n_b, span_a, span_b in zip(n[:-1], n[1:],
+                                            spans[:-1], spans[1:]):
+            settled &= (n_a > 0) & (n_b > 0) & (
+                np.abs(span_a / n_a - span_b / n_b) <
+                dt * (1. / n_a + 1. / n_b))
+    return settled, rate
+
+
+class RateTable(object):
+    """Firing rates sampled on a uniform grid of input currents.
+
+    Rates between grid points are linearly interpolated, and currents outside
+    the grid are clipped to its ends.
+
+    Parameters
+    ----------
+    J_min, J_max : float
+        The range of input currents covered by the table.
+    rates : ndarray
+        The firing rates at ``len(rates)`` evenly spaced currents from
+        ``J_min`` to ``J_max``.
+    error : float, optional
+        Estimated maximum absolute error of the interpolated rates.
+    """
+
+    def __init__(self, J_min, J_max, rates, error=None):
+        self.J_min = float(J_min)
+        self.J_max = float(J_max)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.error = error
+        if self.rates.ndim != 1 or self.rates.size < 2:
+            raise ValueError("Rate table needs at least two points")
+        if not self.J_max > self.J_min:
+            raise ValueError("J_max must be greater than J_min")
+        # a zero slope past the last point avoids clipping the indices
+        self._slopes = np.append(np.diff(self.rates), 0)
+        self._scale = (self.rates.size - 1) / (self.J_max - self.J_min)
+
+    @property
+    def J(self):
+        """The input currents of the table."""
+        return np.linspace(self.J_min, self.J_max, self.rates.size)
+
+    def __call__(self, J):
+        x = np.array(J, dtype=np.float64)
+        x -= self.J_min
+        x *= self._scale
+        np.clip(x, 0, self.rates.size - 1, out=x)
+        i = x.astype(np.intp)
+        x -= i
+        x *= self._slopes.take(i)
+        x += self.rates.take(i)
+        return x
+
+
+def make_rate_table(rates, J_min, J_max, n_points):
+    """Tabulate a rate function and estimate the interpolation error.
+
+    The error is estimated as the largest difference between the table and
+    ``rates`` halfway between grid points.
+
+    Parameters
+    ----------
+    rates : function
+        Maps an array of input currents to firing rates.
+    J_min, J_max : float
+        The range of input currents covered by the table.
+    n_points : int
+        The number of grid points.
+    """
+    J = np.linspace(J_min, J_max, n_points)
+    table = RateTable(J_min, J_max, rates(J))
+    midpoints = 0.5 * (J[:-1] + J[1:])
+    table.error = float(np.max(np.abs(table(midpoints) - rates(midpoints))))
+    return table
@@ -0,0 +1,144 @@
+"""Pacing simulations to wall-clock time."""
+
+from __future__ import absolute_import, division
+
+import time
+
+import numpy as np
+
+from .compat import monotonic, range
+
+
+class RealTime(object):
+    """Paces simulation steps to wall-clock time and records how well it does.
+
+    Pass an instance as the ``realtime`` argument of `nengo.Simulator.run`
+    or `nengo.Simulator.run_steps`, or pass ``realtime=True`` to use a new
+    instance with the default parameters, which is then available as
+    ``sim.realtime``::
+
+        sim.run(10., realtime=True)
+        print(sim.realtime.stats())
+        counts, edges = sim.realtime.histogram()
+
+    Step ``i`` of a run is scheduled to start ``i * dt / speed`` seconds
+    after the run started. The simulator sleeps until the next step is due.
+    If it is late, all steps that are due are run back to back, so that the
+    simulation catches up with the clock. The timings of all runs with the
+    same instance are accumulated.
+
+    By default, times are measured with a monotonic clock. On Python 2, this
+    requires the ``monotonic`` package; without it, wall-clock time is used,
+    so setting the system clock during a run disturbs the pacing.
+
+    Parameters
+    ----------
+    speed : float, optional
+        How many times faster than real time to run. Default: 1.
+    max_lag : float, optional
+        If the simulation is more than ``max_lag`` seconds behind the clock,
+        it gives up catching up: the schedule is moved so that the next step
+        is due immediately, which is counted as a resync. By default, the
+        simulation always catches up.
+    clock : callable, optional
+        Returns the current time in seconds. Default: a monotonic clock.
+    sleep : callable, optional
+        Waits for the given number of seconds. Default: ``time.sleep``.
+
+    Attributes
+    ----------
+    n_steps : int
+        The number of steps run.
+    n_overruns : int
+        The number of steps that finished after the scheduled start of the
+        next step.
+    n_resyncs : int
+        The number of times the schedule was moved because of ``max_lag``.
+    latencies : ndarray
+        The time in seconds taken by each step.
+    lateness : ndarray
+        For each batch of steps, the time in seconds by which its first step
+        started late. When the simulation keeps up, this is the jitter of
+        waking up from sleeping.
+    """
+
+    def __init__(self, speed=1., max_lag=None, clock=monotonic,
+                 sleep=time.sleep):
+        if speed <= 0:
+            raise ValueError("'speed' must be positive")
+        self.speed = speed
+        self.max_lag = max_lag
+        self.clock = clock
+        self.sleep = sleep
+        self.reset()
+
+    def reset(self):
+        """Clear the recorded timings."""
+        self.n_steps = 0
+        self.n_overruns = 0
+        self.n_resyncs = 0
+        self.latencies = np.zeros(0)
+        self.lateness = np.zeros(0)
+
+    def run(self, step, n_steps, dt, callback=None):
+        """Call ``step`` ``n_steps`` times, paced to one call per ``dt``.
+
+        ``callback`` is called with no arguments after each step.
+        """
+        period = dt / self.speed
+        latencies = np.zeros(n_steps)
+        lateness = []
+
+        n_before = self.n_steps
+        start = self.clock()
+        i = 0
+        try:
+            while i < n_steps:
+                lag = self.clock() - (start + i * period)
+                if lag < 0:
+                    self.sleep(-lag)
+                    continue
+                if self.max_lag is not None and lag > self.max_lag:
+                    start += lag
+                    lag = 0.
+                    self.n_resyncs += 1
+                lateness.append(lag)
+
+                n_due = min(int(lag // period) + 1, n_steps - i)
+                self._run_batch(step, latencies[i:i + n_due],
+                                start + (i + 1) * period, period, callback)
+                i += n_due
+        finally:
+            # keep the timings of the steps run if a step fails
+            n_run = self.n_steps - n_before
+            self.latencies = np.concatenate(
+                [self.latencies, latencies[:n_run]])
+            self.lateness = np.concatenate([self.lateness, lateness])
+
+    def _run_batch(self, step, latencies, deadline, period, callback):
+        for i in range(len(latencies)):
+            t0 = self.clock()
+            step()
+            t1 = self.clock()
+            latencies[i] = t1 - t0
+            self.n_steps += 1
+            self.n_overruns += t1 > deadline + i * period
+            if callback is not None:
+                callback()
+
+    def histogram(self, bins=10, range=None):
+        """Histogram of the step latencies, as given by ``np.histogram``."""
+        return np.histogram(self.latencies, bins=bins, range=range)
+
+    def stats(self):
+        """Counts of steps, and summaries of step latencies and lateness."""
+        def summary(times):
+            return dict(
+                mean=times.mean() if times.size > 0 else np.nan,
+                std=times.std() if times.size > 0 else np.nan,
+                max=times.max() if times.size > 0 else np.nan)
+
+        return dict(n_steps=self.n_steps, n_overruns=self.n_overruns,
+                    n_resyncs=self.n_resyncs,
+                    latency=summary(self.latencies),
+                    jitter=summary(self.lateness))
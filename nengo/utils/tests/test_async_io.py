@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import nengo
+from nengo.utils.async_io import AsyncIO
+
+
+@pytest.fixture
+def echo_socket(request):
+    """A socket connected to a loopback server that echoes what it gets."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def echo():
+        conn, _ = server.accept()
+        while True:
+            data = conn.recv(4096)
+            if len(data) == 0:
+                break
+            conn.sendall(data)
+        conn.close()
+
+    thread = threading.Thread(target=echo)
+    thread.daemon = True
+    thread.start()
+    sock = socket.create_connection(server.getsockname())
+
+    def close():
+        sock.close()
+        thread.join(1.)
+        server.close()
+    request.addfinalizer(close)
+    return sock
+
+
+def test_socket(RefSimulator, echo_socket):
+    io = AsyncIO.from_socket(echo_socket, size_in=2, size_out=2,
+                             max_queue=1000)
+    with nengo.Network() as model:
+        u = nengo.Node(lambda t: [t, -t])
+        node = nengo.Node(io, size_in=io.size_in, size_out=io.size_out)
+        nengo.Connection(u, node, synapse=None)
+        p_u = nengo.Probe(u)
+        p = nengo.Probe(node)
+
+    sim = RefSimulator(model)
+    for _ in range(100):
+        sim.step()
+        time.sleep(0.001)
+    io.close()
+
+    stats = io.stats()
+    assert stats['n_sent'] == 100
+    assert stats['n_dropped'] == 0
+    assert stats['n_received'] > 0
+    assert stats['n_read'] + stats['n_missed'] <= stats['n_received']
+    assert np.all(np.isfinite(list(stats['output_latency'].values())))
+
+    # outputs are zero until an input arrives, then echo inputs sent so far
+    y = sim.data[p]
+    t = sim.trange()
+    assert np.all(y[:, 0] == -y[:, 1])
+    received = y[:, 0] > 0
+    assert np.any(received)
+    assert np.all(y[~received] == 0)
+    assert np.all(y[received, 0] <= t[received])
+    assert np.all(np.in1d(y[received, 0], sim.data[p_u][:, 0]))
+    assert np.all(np.diff(y[received, 0]) >= 0)
+
+
+def test_nonblocking():
+    """The simulator neither waits for inputs nor for outputs to be sent."""
+    unblock = threading.Event()
+    sending = threading.Event()
+    received = []
+
+    def receive():
+        unblock.wait(0.01)
+        return [1.] if unblock.is_set() else None
+
+    def send(x):
+        sending.set()
+        unblock.wait()
+        received.append(x[0])
+
+    io = AsyncIO(1, 1, receive=receive, send=send, max_queue=2)
+    for i in range(10):
+        assert io(i * 0.001, np.array([i]))[0] == 0
+        sending.wait()
+    unblock.set()
+    io.close()
+
+    # the first output was being sent, later ones dropped when queue was full
+    assert received == [0, 8, 9]
+    assert io.n_sent == 3
+    assert io.n_dropped == 7
+
+
+def test_stale():
+    inputs = [np.array([1., 2.])]
+
+    def receive():
+        return inputs.pop() if inputs else time.sleep(0.001)
+
+    with AsyncIO(0, 2, receive=receive, max_age=0.05) as io:
+        while io.n_received == 0:
+            time.sleep(0.001)
+        assert np.all(io(0.) == [1., 2.])
+        time.sleep(0.06)
+        assert np.all(io(0.001) == 0)
+    assert io.n_received == io.n_read == 1
+    assert io.n_stale == 1
+    assert io.stats()['input_age']['max'] > 0.05
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        AsyncIO(1, 0)
+    with pytest.raises(ValueError):
+        AsyncIO(0, 1)
+
+    def send(x):
+        raise RuntimeError("sink failed")
+
+    io = AsyncIO(1, 0, send=send)
+    io(0., np.zeros(1))
+    with pytest.raises(RuntimeError):
+        io.close()
@@ -71,3 +71,25 @@ def test_function_list():
     assert np.allclose(f(0.5), func2(0.5))
     assert np.allclose(f(0.75), func2(0.75))
     assert np.allclose(f(1.0), func2(1.0))
+
+
+def test_vectorized(rng):
+    data = dict((t, rng.uniform(size=2)) for t in rng.uniform(0, 10, 1000))
+    data[5.] = lambda t: [t, -t]
+    f = piecewise(data)
+
+    t = np.linspace(-1, 11, 2001)
+    y = f(t)
+    assert y.shape == (len(t), 2)
+    assert np.allclose(y, [f(ti) for ti in t])
+
+    # breakpoints are found by binary search
+    times = np.array(sorted(data))
+    assert np.allclose(f(times[:-1]), [data[ti] if ti != 5. else [ti, -ti]
+                                       for ti in times[:-1]])
+
+
+def test_data_unchanged():
+    data = {0.5: [1, 0], 1.0: [0, 1]}
+    piecewise(data)
+    assert data == {0.5: [1, 0], 1.0: [0, 1]}
@@ -8,7 +8,8 @@ import nengo
 from nengo.dists import Choice
 from nengo.processes import WhiteSignal
 from nengo.utils.matplotlib import implot
-from nengo.utils.neurons import rates_isi, rates_kernel
+from nengo.utils.neurons import (
+    make_rate_table, rates_isi, rates_kernel, RateTable, settled_firingrate)
 from nengo.utils.numpy import rms
 
 
@@ -93,3 +94,42 @@ def test_rates(Simulator, plt, seed, logger):
         logger.info('rate estimator: %s', name)
         logger.info('relative RMSE: %0.4f', rel_rmse)
     plt.saveas = None
+
+
+def test_rate_table(rng):
+    table = make_rate_table(lambda J: np.maximum(J, 0), -1, 3, 9)
+    assert np.allclose(table.J, np.linspace(-1, 3, 9))
+    assert table.error == 0
+
+    J = rng.uniform(-2, 4, size=(10, 3))
+    assert np.allclose(table(J), np.clip(J, 0, 3))
+
+    table = make_rate_table(np.square, 0, 1, 3)
+    assert np.allclose(table.error, 0.0625)
+    assert np.allclose(table(0.25), 0.125)
+
+    with pytest.raises(ValueError):
+        RateTable(0, 1, [1.])
+    with pytest.raises(ValueError):
+        RateTable(1, 0, [1., 2.])
+
+
+@pytest.mark.parametrize('neuron_type', [nengo.LIF(), nengo.Izhikevich()])
+def test_settled_firingrate(neuron_type, rng):
+    J = np.linspace(-5, 40, 400).reshape(20, 20)
+    if isinstance(neuron_type, nengo.Izhikevich):
+        J = J * 5
+
+    def rates(**kwargs):
+        states = [np.zeros_like(J), np.zeros_like(J)]
+        return settled_firingrate(neuron_type.step_math, J, states, **kwargs)
+
+    full = rates()
+    assert full.shape == J.shape
+    assert np.array_equal(rates(chunk_size=64, n_threads=3), full)
+
+    early = rates(tol=1.)
+    assert early.shape == J.shape
+    assert np.allclose(early, full, atol=3)
+    assert np.mean(np.abs(early - full)) < 0.5
+    assert np.array_equal(rates(tol=1., chunk_size=64, n_threads=3), early)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from nengo.utils.compat import monotonic
+from nengo.utils.realtime import RealTime
+
+# a period that is exact in binary, so that the fake times are exact
+period = 2. ** -10
+
+
+class FakeClock(object):
+    """A clock that only advances when sleeping or when told to."""
+
+    def __init__(self):
+        self.t = 0.
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        assert seconds > 0
+        self.t += seconds
+
+
+def make_step(clock, durations=None):
+    """A step that takes ``durations[i]`` on call ``i`` and records starts."""
+    durations = {} if durations is None else durations
+    starts = []
+
+    def step():
+        starts.append(clock())
+        clock.t += durations.get(len(starts) - 1, 0.)
+    return step, starts
+
+
+def test_pacing():
+    clock = FakeClock()
+    realtime = RealTime(speed=2., clock=clock, sleep=clock.sleep)
+    step, starts = make_step(clock, dict((i, 0.25 * period)
+                                         for i in range(100)))
+    realtime.run(step, 100, 2 * period)
+
+    assert np.array_equal(starts, np.arange(100) * period)
+    assert realtime.n_steps == 100
+    assert realtime.n_overruns == 0
+    assert realtime.n_resyncs == 0
+    assert np.array_equal(realtime.latencies, 0.25 * period * np.ones(100))
+    assert np.array_equal(realtime.lateness, np.zeros(100))
+
+    stats = realtime.stats()
+    assert stats['n_steps'] == 100
+    assert stats['latency']['max'] == 0.25 * period
+    assert stats['jitter']['max'] == 0
+
+    # timings accumulate over runs
+    realtime.run(step, 10, 2 * period)
+    assert realtime.n_steps == 110
+    assert realtime.histogram(bins=5)[0].sum() == 110
+    realtime.reset()
+    assert realtime.n_steps == 0
+
+
+def test_catch_up():
+    clock = FakeClock()
+    realtime = RealTime(clock=clock, sleep=clock.sleep)
+    step, starts = make_step(clock, {10: 20.5 * period})
+    realtime.run(step, 100, period)
+
+    # steps 11 to 30, due while the slow step ran, are run back to back
+    expected = np.arange(100) * period
+    expected[11:31] = 30.5 * period
+    assert np.array_equal(starts, expected)
+    assert np.argmax(realtime.latencies) == 10
+    assert realtime.n_overruns == 1 + 19  # the last one finished in time
+    assert realtime.n_resyncs == 0
+    assert len(realtime.lateness) == 100 - 19
+    assert realtime.lateness.max() == 19.5 * period
+
+
+def test_max_lag():
+    clock = FakeClock()
+    realtime = RealTime(max_lag=5 * period, clock=clock, sleep=clock.sleep)
+    step, starts = make_step(clock, {10: 20.5 * period})
+    realtime.run(step, 50, period)
+
+    # the schedule moves by the time lost to the slow step
+    expected = np.arange(50) * period
+    expected[11:] += 19.5 * period
+    assert np.array_equal(starts, expected)
+    assert realtime.n_overruns == 1
+    assert realtime.n_resyncs == 1
+    assert np.array_equal(realtime.lateness, np.zeros(50))
+
+
+def test_wall_clock():
+    realtime = RealTime()
+    t0 = monotonic()
+    realtime.run(lambda: None, 20, 0.005)
+    assert monotonic() - t0 >= 0.09
+    assert realtime.n_steps == 20
+
+
+def test_failing_step():
+    def step():
+        if realtime.n_steps == 5:
+            raise RuntimeError("step failed")
+
+    clock = FakeClock()
+    realtime = RealTime(clock=clock, sleep=clock.sleep)
+    with pytest.raises(RuntimeError):
+        realtime.run(step, 10, period)
+    assert realtime.n_steps == 5
+    assert len(realtime.latencies) == 5
+
+    with pytest.raises(ValueError):
+        RealTime(speed=0)